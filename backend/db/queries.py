@@ -41,16 +41,16 @@ ORDER BY crescimento_percentual DESC
 LIMIT 5;
 """
 
+# Recorte por UF do cubo: mesmos totais de despesas_agregadas, em que
+# cada linha é uma RazaoSocial/UF (media_geral = total / razões sociais)
 DESPESAS_TOTAIS="""
 SELECT
     uf,
-    COUNT(DISTINCT registro_ans) AS total_operadoras,
-    SUM(valor_despesas) AS total_despesas,
-    ROUND(SUM(valor_despesas) / COUNT(DISTINCT registro_ans)::numeric, 2) AS media_por_operadora,
-    ROUND(AVG(valor_despesas), 2) AS media_geral
-FROM despesas_agregadas
-WHERE uf IS NOT NULL
-GROUP BY uf
+    operadoras AS total_operadoras,
+    valor_despesas AS total_despesas,
+    ROUND(valor_despesas / operadoras, 2) AS media_por_operadora,
+    ROUND(valor_despesas / razoes_sociais, 2) AS media_geral
+FROM cubo_despesas_uf
 ORDER BY total_despesas DESC
 LIMIT 5;
 """
@@ -130,11 +130,11 @@ def despesas_da_operadora(
 @router.get("/estatisticas/despesas-uf")
 def despesas_por_uf(db: Session = Depends(get_db)):
     """Retorna despesas agregadas por UF para o gráfico"""
+    # Recorte por UF já somado pelo pipeline (mesmo total de despesas_agregadas)
     despesas = db.execute(
         text("""
-            SELECT uf, SUM(CAST(valor_despesas AS FLOAT)) as total
-            FROM despesas_agregadas
-            GROUP BY uf
+            SELECT uf, CAST(valor_despesas AS FLOAT) as total
+            FROM cubo_despesas_uf
             ORDER BY uf
         """)
     ).fetchall()
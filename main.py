@@ -1,93 +1,322 @@
+import os
 import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
 
-from src.downloader import obter_ultimos_trimestres, baixar_zip
+from src.downloader import (
+    NOME_CADASTRO,
+    baixar_cadastro_operadoras,
+    baixar_trimestres,
+    obter_ultimos_trimestres,
+)
 from src.extractor import extrair_zips
-from src.parser import processar_pasta
-from src.consolidator import consolidar_dados
+from src.manifest import carregar_manifesto, impressao_trimestre
+from src.lotes import concatenar_lotes, ler_lote_parquet, salvar_lote_parquet
+from src.parser import PASTA_TRIMESTRES, processar_trimestre, VERSAO_PARSER
+from src.consolidator import caminho_particao, exportar_consolidado, preparar_consolidado
+from src.auditoria import NOME_AUDITORIA
+from src.cadastro import VERSAO_CADASTRO
 from src.enrycher import enriquecer_dados
 from src.validator import validar_dados
-from src.aggregator import agregar_e_exportar as agregar_despesas
+from src.aggregator import VERSAO_AGREGACAO, agregar_e_exportar as agregar_despesas
+from src.cubo import PASTA_CUBO
+from src.pipeline import MAX_ETAPAS_PARALELAS, PipelineInterrompido, etapa, executar_etapas
+from src.instrumentacao import configurar as configurar_metricas, medir, salvar_relatorio
 
 PASTA_EXTRAIDA = "data/extracted"
+PASTA_RAW = "data/raw"
+PASTA_SAIDA = "data/output"
+# "zip" lê direto dos ZIPs baixados; "disco" extrai para data/extracted antes
+MODO_LEITURA = os.getenv("ETL_MODO_LEITURA", "zip")
+# Processos usados no parsing dos arquivos (1 = serial)
+WORKERS_PARSER = int(os.getenv("ETL_WORKERS", "1"))
 CAMINHO_CONSOLIDADO = "data/output/consolidado_despesas.csv"
+CAMINHO_RELATORIO_VALIDACAO = "data/output/validacao_rejeicoes.json"
+# Checkpoint dos dados validados: a agregação pode ser refeita sem
+# reprocessar enriquecimento e validação
+CAMINHO_VALIDADO = "data/cache/etapas/validado.parquet"
+# "memoria": o consolidado tipado segue direto para as próximas etapas e o
+# CSV/ZIP é gravado em paralelo; "csv": relê o ZIP exportado (legado)
+MODO_HANDOFF = os.getenv("ETL_HANDOFF", "memoria")
+# Saídas extras das exportações, separadas por vírgula (ex: "gzip,parquet")
+FORMATOS_EXPORTACAO = tuple(f for f in os.getenv("ETL_FORMATOS", "").split(",") if f)
+# Processos da agregação (1 = serial); ETL_COMPARAR_AGREGACAO=1 confere
+# o resultado paralelo contra o serial
+WORKERS_AGREGACAO = int(os.getenv("ETL_WORKERS_AGREGACAO", "1"))
+COMPARAR_AGREGACAO = os.getenv("ETL_COMPARAR_AGREGACAO", "0") == "1"
+# Etapas independentes executadas ao mesmo tempo (1 = uma por vez)
+ETAPAS_PARALELAS = int(os.getenv("ETL_ETAPAS_PARALELAS", str(MAX_ETAPAS_PARALELAS)))
+# Métricas de execução: relatório sempre gravado em data/output/relatorio_execucao.json/.csv;
+# ETL_LOG_METRICAS acrescenta cada métrica como linha JSON num arquivo ("-" = stderr)
+# e ETL_TRACEMALLOC=1 mede o pico de memória Python (mais lento)
+LOG_METRICAS = os.getenv("ETL_LOG_METRICAS") or None
+USAR_TRACEMALLOC = os.getenv("ETL_TRACEMALLOC", "0") == "1"
+# Etapas perfiladas, separadas por vírgula (ex: "parse,enriquecimento" ou
+# "todas"); perfis em data/output/perfil. Vazio = sem profiler
+PERFIS = tuple(p for p in os.getenv("ETL_PERFIL", "").split(",") if p)
+
+
+def _chave(ano, trimestre) -> str:
+    return f"{ano}_{trimestre}T"
+
+
+def _ler_validado():
+    return pd.read_parquet(CAMINHO_VALIDADO)
 
-def main():
-    """Pipeline ETL para dados da ANS."""
-    try:
-        print("="*60)
-        print("PIPELINE ETL - DEMONSTRAÇÕES CONTÁBEIS ANS")
-        print("="*60)
-        
-        print("\n[1/6] Identificando os últimos trimestres disponíveis...")
-        trimestres = obter_ultimos_trimestres(3)
-        
-        if not trimestres:
-            print("ERRO: Nenhum trimestre encontrado na fonte de dados.")
-            return
-        
-        print(f"      Trimestres encontrados: {[(t[1], t[0]) for t in trimestres]}")
 
-        print("\n[2/6] Baixando arquivos ZIP...")
-        for ano, trimestre, arquivo in trimestres:
-            print(f"      → {trimestre}T/{ano}")
-            baixar_zip(ano, trimestre, arquivo)
+def montar_etapas(trimestres, manifesto: dict, executor_parser=None) -> list:
+    """
+    Monta o grafo de etapas do pipeline para os `trimestres` encontrados.
 
-        print("\n[3/6] Extraindo arquivos ZIP...")
-        extrair_zips()
+    download_AAAA_QT ─ [extracao_AAAA_QT] ─ parse_AAAA_QT ─┐  (um ramo por trimestre)
+                                                           └─ consolidacao ─┬─ exportacao
+                                                                            └─ enriquecimento ─ validacao ─ agregacao
+    cadastro ─────────────────────────────────────────────────────────────────────┘ (enriquecimento e agregacao)
 
-        print("\n[4/6] Processando arquivos extraídos...")
-        todos_os_dados = []
+    Cada trimestre tem seu próprio ramo: republicar um ZIP só refaz o
+    parse daquele trimestre. O cadastro é baixado em paralelo aos
+    trimestres, e os trimestres são processados em paralelo entre si; a
+    exportação do consolidado roda junto com enriquecimento e validação.
 
-        for ano, trimestre, _ in trimestres:
-            dados = processar_pasta(
-                pasta_base=PASTA_EXTRAIDA,
-                ano=ano,
-                trimestre=trimestre
+    Args:
+        trimestres: Tuplas (ano, trimestre, nome_arquivo) de obter_ultimos_trimestres.
+        manifesto: Manifesto do pipeline, compartilhado pelas etapas.
+        executor_parser: Pool de processos compartilhado pelos trimestres (opcional).
+
+    Returns:
+        Lista de etapas (src.pipeline.etapa).
+    """
+    disco = MODO_LEITURA == "disco"
+
+    def impressoes_trimestres() -> dict:
+        # Impressão digital das fontes: muda se algum trimestre for republicado
+        entradas = {
+            _chave(ano, trimestre): impressao_trimestre(manifesto, _chave(ano, trimestre), extraido=disco)
+            for ano, trimestre, _ in trimestres
+        }
+        entradas["versao_parser"] = VERSAO_PARSER
+        return entradas
+
+    def baixar(ano, trimestre, arquivo):
+        # Sem o ZIP, o parse do trimestre não tem o que ler: a etapa falha
+        # (sem checkpoint) e a próxima execução tenta o download de novo
+        if not baixar_trimestres([(ano, trimestre, arquivo)], manifesto=manifesto).get((ano, trimestre)):
+            raise PipelineInterrompido(f"Falha ao baixar {arquivo} ({trimestre}T/{ano}).")
+
+    etapas = []
+    for ano, trimestre, arquivo in trimestres:
+        chave = _chave(ano, trimestre)
+        etapas.append(etapa(
+            f"download_{chave}",
+            lambda _, t=(ano, trimestre, arquivo): baixar(*t),
+            saidas=[os.path.join(PASTA_RAW, f"{chave}_{arquivo}")],
+            descricao=f"Baixando {arquivo}"
+        ))
+
+        if disco:
+            # Sempre roda: extrair_zips já pula pastas extraídas do mesmo ZIP
+            etapas.append(etapa(
+                f"extracao_{chave}",
+                lambda _, c=chave: extrair_zips(manifesto, chaves=[c]),
+                depende=[f"download_{chave}"],
+                descricao=f"Extraindo {trimestre}T/{ano}"
+            ))
+
+    etapas.append(etapa(
+        "cadastro",
+        lambda _: baixar_cadastro_operadoras(manifesto),
+        saidas=[os.path.join(PASTA_SAIDA, NOME_CADASTRO)],
+        descricao="Atualizando cadastro das operadoras"
+    ))
+
+    def etapa_parse(ano, trimestre):
+        chave = _chave(ano, trimestre)
+        caminho_cache = os.path.join(PASTA_TRIMESTRES, f"{chave}.parquet")
+
+        def executar(_):
+            lote = processar_trimestre(
+                PASTA_EXTRAIDA if disco else PASTA_RAW,
+                ano,
+                trimestre,
+                manifesto=manifesto,
+                modo=MODO_LEITURA,
+                workers=WORKERS_PARSER,
+                executor=executor_parser
             )
-            todos_os_dados.extend(dados)
-            print(f"      → {trimestre}T/{ano}: {len(dados)} registros")
+            print(f"      → {trimestre}T/{ano}: {len(lote)} registros")
+            return lote
 
-        print(f"\n      Total de registros processados: {len(todos_os_dados)}")
-        
-        if not todos_os_dados:
-            print("ERRO: Nenhum registro extraído dos arquivos.")
-            return
-        
-        consolidado_despesas = consolidar_dados(todos_os_dados)
-        
-        if not consolidado_despesas:
-            print("ERRO: Falha ao gerar arquivo consolidado.")
-            return
-            
-        print(f"      Arquivo consolidado: {consolidado_despesas}")
+        return etapa(
+            f"parse_{chave}",
+            executar,
+            depende=[f"extracao_{chave}" if disco else f"download_{chave}"],
+            entradas=lambda: {
+                "origem": impressao_trimestre(manifesto, chave, extraido=disco),
+                "versao_parser": VERSAO_PARSER,
+                "modo": MODO_LEITURA
+            },
+            saidas=[caminho_cache],
+            carregar=lambda: ler_lote_parquet(caminho_cache),
+            descricao=f"Processando {trimestre}T/{ano}"
+        )
+
+    etapas_parse = [etapa_parse(ano, trimestre) for ano, trimestre, _ in trimestres]
+    etapas.extend(etapas_parse)
+
+    def consolidar(valores):
+        todos_os_dados = concatenar_lotes(valores[e["nome"]] for e in etapas_parse)
+        print(f"      Total de registros processados: {len(todos_os_dados)}")
 
-        df_consolidado = pd.read_csv(
-            consolidado_despesas,
-            sep=";",
-            dtype=str
+        if todos_os_dados.empty:
+            raise PipelineInterrompido("Nenhum registro extraído dos arquivos.")
+
+        df = preparar_consolidado(todos_os_dados, manifesto=manifesto, entradas=impressoes_trimestres())
+        if df is None:
+            raise PipelineInterrompido("Falha ao gerar arquivo consolidado.")
+        return df
+
+    def exportar(valores):
+        caminho = exportar_consolidado(
+            valores["consolidacao"],
+            manifesto=manifesto,
+            entradas=impressoes_trimestres(),
+            formatos=FORMATOS_EXPORTACAO
         )
+        print(f"      Arquivo consolidado: {caminho}")
+        return caminho
 
-        print("\n[5/6] Enriquecendo dados com cadastro das operadoras...")
-        df_enriquecido = enriquecer_dados(df_consolidado)
+    def enriquecer(valores):
+        if MODO_HANDOFF == "memoria":
+            df_consolidado = valores["consolidacao"]
+        else:
+            df_consolidado = pd.read_csv(valores["exportacao"], sep=";", dtype=str)
+
+        df_enriquecido = enriquecer_dados(df_consolidado, manifesto, caminho_cadastro=valores["cadastro"])
         print(f"      Registros após enriquecimento: {len(df_enriquecido)}")
+        return df_enriquecido
 
-        print("\n[6/6] Validando e agregando dados...")
-        df_validado = validar_dados(df_enriquecido)
+    def validar(valores):
+        df_validado = validar_dados(valores["enriquecimento"], caminho_relatorio=CAMINHO_RELATORIO_VALIDACAO)
         print(f"      Registros válidos: {len(df_validado)}")
-        
+
         if df_validado.empty:
-            print("ERRO: Nenhum registro válido após validação.")
+            raise PipelineInterrompido("Nenhum registro válido após validação.")
+
+        salvar_lote_parquet(df_validado, CAMINHO_VALIDADO)
+        return df_validado
+
+    def agregar(valores):
+        # Estados parciais da agregação dependem também do cadastro usado
+        agregar_despesas(
+            valores["validacao"],
+            formatos=FORMATOS_EXPORTACAO,
+            manifesto=manifesto,
+            entradas={
+                **impressoes_trimestres(),
+                "cadastro": manifesto["fontes"].get(NOME_CADASTRO, {}).get("sha256")
+            },
+            workers=WORKERS_AGREGACAO,
+            comparar=COMPARAR_AGREGACAO
+        )
+
+    etapas += [
+        etapa(
+            "consolidacao",
+            consolidar,
+            depende=[e["nome"] for e in etapas_parse],
+            entradas=impressoes_trimestres,
+            saidas=[caminho_particao(ano, trimestre) for ano, trimestre, _ in trimestres],
+            descricao="Consolidando trimestres"
+        ),
+        etapa(
+            "exportacao",
+            exportar,
+            depende=["consolidacao"],
+            entradas=lambda: {"formatos": FORMATOS_EXPORTACAO},
+            saidas=[
+                os.path.join(PASTA_SAIDA, "consolidado_despesas.zip"),
+                os.path.join(PASTA_SAIDA, NOME_AUDITORIA)
+            ],
+            descricao="Exportando consolidado"
+        ),
+        etapa(
+            "enriquecimento",
+            enriquecer,
+            depende=["consolidacao", "cadastro"] + (["exportacao"] if MODO_HANDOFF != "memoria" else []),
+            entradas=lambda: {"versao_cadastro": VERSAO_CADASTRO, "handoff": MODO_HANDOFF},
+            descricao="Enriquecendo dados com cadastro das operadoras"
+        ),
+        etapa(
+            "validacao",
+            validar,
+            depende=["enriquecimento"],
+            entradas=lambda: {},
+            saidas=[CAMINHO_RELATORIO_VALIDACAO, CAMINHO_VALIDADO],
+            carregar=_ler_validado,
+            descricao="Validando dados"
+        ),
+        etapa(
+            "agregacao",
+            agregar,
+            depende=["validacao", "cadastro"],
+            entradas=lambda: {"formatos": FORMATOS_EXPORTACAO, "versao_agregacao": VERSAO_AGREGACAO},
+            saidas=[
+                os.path.join(PASTA_SAIDA, "despesas_agregadas.csv"),
+                os.path.join(PASTA_SAIDA, "Teste_Joao_Vitor_Vale_da_Cruz.zip"),
+                os.path.join(PASTA_SAIDA, PASTA_CUBO, "cubo_despesas.csv")
+            ],
+            descricao="Agregando dados"
+        ),
+    ]
+
+    return etapas
+
+
+def main():
+    """Pipeline ETL para dados da ANS."""
+    configurar_metricas(log=LOG_METRICAS, usar_tracemalloc=USAR_TRACEMALLOC)
+
+    try:
+        print("="*60)
+        print("PIPELINE ETL - DEMONSTRAÇÕES CONTÁBEIS ANS")
+        print("="*60)
+
+        print("\nIdentificando os últimos trimestres disponíveis...")
+        with medir("etapa", "trimestres"):
+            trimestres = obter_ultimos_trimestres(3)
+
+        if not trimestres:
+            print("ERRO: Nenhum trimestre encontrado na fonte de dados.")
             return
 
-        agregar_despesas(df_validado)
+        print(f"      Trimestres encontrados: {[(t[1], t[0]) for t in trimestres]}")
+
+        manifesto = carregar_manifesto()
+
+        # Um único pool de processos para os trimestres processados em paralelo
+        pool_parser = ProcessPoolExecutor(max_workers=WORKERS_PARSER) if WORKERS_PARSER > 1 else nullcontext()
+
+        with pool_parser as executor_parser:
+            try:
+                executar_etapas(
+                    montar_etapas(trimestres, manifesto, executor_parser),
+                    manifesto,
+                    max_paralelas=ETAPAS_PARALELAS,
+                    perfis=PERFIS
+                )
+            except PipelineInterrompido as e:
+                print(f"ERRO: {e}")
+                return
 
         print("\n" + "="*60)
         print("PIPELINE FINALIZADO COM SUCESSO!")
         print("="*60)
-        
+
     except Exception as e:
         print(f"\nERRO FATAL: {e}")
         raise
+    finally:
+        print(f"Relatório de execução: {salvar_relatorio()}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
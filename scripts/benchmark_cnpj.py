@@ -0,0 +1,68 @@
+"""
+Benchmark da validação de CNPJ: `validar_cnpj` linha a linha (apply)
+contra a versão vetorizada `validar_cnpjs`.
+Uso: python scripts/benchmark_cnpj.py [linhas] [cnpjs_distintos]
+
+Também confere que as duas versões dão exatamente o mesmo resultado.
+"""
+import os
+import sys
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+from src.validator import validar_cnpj, validar_cnpjs
+
+LINHAS = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+DISTINTOS = int(sys.argv[2]) if len(sys.argv) > 2 else 2_000
+
+
+def gerar_cnpj(rng: np.random.Generator) -> str:
+    """CNPJ com dígitos verificadores corretos, às vezes formatado."""
+    base = "".join(str(d) for d in rng.integers(0, 10, 12))
+
+    for peso in ([5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2], [6, 5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2]):
+        resto = sum(int(base[i]) * peso[i] for i in range(len(peso))) % 11
+        base += "0" if resto < 2 else str(11 - resto)
+
+    if rng.random() < 0.5:
+        return f"{base[:2]}.{base[2:5]}.{base[5:8]}/{base[8:12]}-{base[12:]}"
+    return base
+
+
+def gerar_amostra(linhas: int, distintos: int, semente: int = 42) -> pd.Series:
+    rng = np.random.default_rng(semente)
+    cnpjs = [gerar_cnpj(rng) for _ in range(distintos)]
+
+    # Casos inválidos: dígito trocado, tamanho errado, repetidos, vazios e nulos
+    cnpjs[::7] = [c[:-1] + str((int(c[-1]) + 1) % 10) for c in cnpjs[::7]]
+    cnpjs[1::11] = [c[:-3] for c in cnpjs[1::11]]
+    cnpjs[2::13] = [str(d) * 14 for d in rng.integers(0, 10, len(cnpjs[2::13]))]
+    cnpjs[3::17] = [""] * len(cnpjs[3::17])
+    cnpjs[4::19] = [None] * len(cnpjs[4::19])
+
+    return pd.Series(rng.choice(np.array(cnpjs, dtype=object), linhas))
+
+
+def medir(funcao, *args):
+    inicio = time.perf_counter()
+    resultado = funcao(*args)
+    return resultado, time.perf_counter() - inicio
+
+
+if __name__ == "__main__":
+    amostra = gerar_amostra(LINHAS, DISTINTOS)
+    print(f"{LINHAS} linhas, {DISTINTOS} CNPJs distintos")
+
+    escalar, tempo_escalar = medir(lambda s: s.apply(validar_cnpj).to_numpy(dtype=bool), amostra)
+    vetorizado, tempo_vetorizado = medir(validar_cnpjs, amostra)
+
+    if not np.array_equal(escalar, vetorizado):
+        print(f"ERRO: {np.count_nonzero(escalar != vetorizado)} resultados divergentes")
+        sys.exit(1)
+
+    print(f"  apply(validar_cnpj): {tempo_escalar:8.3f} s")
+    print(f"  validar_cnpjs:       {tempo_vetorizado:8.3f} s ({tempo_escalar / tempo_vetorizado:.1f}x)")
+    print(f"  Válidos: {int(vetorizado.sum())} de {LINHAS} (resultados idênticos)")
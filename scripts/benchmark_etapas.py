@@ -0,0 +1,259 @@
+"""
+Benchmark das etapas do pipeline sobre dados sintéticos (scripts/gerar_dados_ans.py).
+Uso: python scripts/benchmark_etapas.py [--linhas N] [--trimestres N] [--formato csv|xlsx|misto] [--repeticoes N]
+
+Mede processar_pasta, consolidar_dados, enriquecer_dados, validar_dados e
+agregar_e_exportar (tempo de parede, CPU, pico de RSS e linhas), sem rede e
+sem caches (data/cache é apagada a cada repetição), numa pasta temporária.
+Cada execução é acrescentada a data/benchmarks/resultados.jsonl e comparada
+com a anterior de mesmos parâmetros; etapas mais lentas que o limiar são
+marcadas como regressão.
+
+Os dados gerados ficam em data/benchmarks/dados/ e são reaproveitados
+(o gerador é determinístico).
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import zipfile
+from contextlib import nullcontext, redirect_stdout
+from datetime import datetime
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+import numpy as np
+import pandas as pd
+
+from gerar_dados_ans import gerar_dataset
+from src import parser
+from src.aggregator import agregar_e_exportar
+from src.consolidator import consolidar_dados, preparar_consolidado
+from src.enrycher import enriquecer_dados
+from src.instrumentacao import configurar, medir
+from src.lotes import concatenar_lotes
+from src.validator import validar_dados
+
+PASTA_BENCHMARKS = os.path.join(RAIZ, "data", "benchmarks")
+CAMINHO_RESULTADOS = os.path.join(PASTA_BENCHMARKS, "resultados.jsonl")
+ETAPAS = ["processar_pasta", "consolidar_dados", "enriquecer_dados", "validar_dados", "agregar_e_exportar"]
+# Etapa mais lenta que a execução anterior além deste limiar = regressão
+LIMIAR_REGRESSAO = 0.10
+
+
+def preparar_dados(linhas: int, trimestres: int, formato: str, semente: int) -> dict:
+    """Gera (ou reaproveita) o conjunto sintético com esses parâmetros."""
+    pasta = os.path.join(PASTA_BENCHMARKS, "dados", f"{linhas}_{trimestres}_{formato}_{semente}")
+    marcador = os.path.join(pasta, "conjunto.json")
+
+    if os.path.exists(marcador):
+        with open(marcador, encoding="utf-8") as f:
+            return json.load(f)
+
+    print(f"Gerando dados sintéticos em {pasta}...")
+    conjunto = gerar_dataset(pasta, linhas=linhas, trimestres=trimestres, formato=formato, semente=semente)
+    with open(marcador, "w", encoding="utf-8") as f:
+        json.dump(conjunto, f, indent=2)
+    return conjunto
+
+
+def extrair(conjunto: dict, pasta_extraida: str) -> list:
+    """Extrai os ZIPs para pasta_extraida/AAAA_QT/, como o extractor do pipeline."""
+    periodos = []
+    for ano, trimestre, caminho_zip in conjunto["trimestres"]:
+        with zipfile.ZipFile(caminho_zip) as zip_ref:
+            zip_ref.extractall(os.path.join(pasta_extraida, f"{ano}_{trimestre}T"))
+        periodos.append((ano, trimestre))
+    return periodos
+
+
+def executar_uma_vez(periodos: list, pasta_extraida: str, caminho_cadastro: str, saida: str) -> dict:
+    """Roda as etapas em sequência, cada uma com a saída da anterior; devolve as métricas."""
+    metricas = {}
+
+    def medida(nome):
+        return medir("etapa", nome, guardar=False)
+
+    with medida("processar_pasta") as m:
+        lote = concatenar_lotes(
+            parser.processar_pasta(pasta_extraida, ano, trimestre)
+            for ano, trimestre in periodos
+        )
+        m["linhas_saida"] = len(lote)
+    metricas["processar_pasta"] = m
+
+    with medida("consolidar_dados") as m:
+        m["linhas_entrada"] = len(lote)
+        consolidar_dados(lote, caminho_saida=saida)
+    metricas["consolidar_dados"] = m
+
+    # Mesmo conteúdo do CSV exportado, já tipado (como no pipeline)
+    df = preparar_consolidado(lote, caminho_saida=saida)
+
+    with medida("enriquecer_dados") as m:
+        m["linhas_entrada"] = len(df)
+        df = enriquecer_dados(df, caminho_cadastro=caminho_cadastro)
+        m["linhas_saida"] = len(df)
+    metricas["enriquecer_dados"] = m
+
+    with medida("validar_dados") as m:
+        m["linhas_entrada"] = len(df)
+        df = validar_dados(df, caminho_relatorio=os.path.join(saida, "validacao_rejeicoes.json"))
+        m["linhas_saida"] = len(df)
+    metricas["validar_dados"] = m
+
+    with medida("agregar_e_exportar") as m:
+        m["linhas_entrada"] = len(df)
+        agregar_e_exportar(df, output_dir=saida)
+    metricas["agregar_e_exportar"] = m
+
+    return metricas
+
+
+def resumir(execucoes: list) -> dict:
+    """Mediana e mínimo do tempo de cada etapa; demais campos da última repetição."""
+    resumo = {}
+    for etapa in ETAPAS:
+        medidas = [execucao[etapa] for execucao in execucoes]
+        duracoes = [m["duracao_s"] for m in medidas]
+        resumo[etapa] = {
+            "duracao_s": duracoes,
+            "mediana_s": round(statistics.median(duracoes), 6),
+            "minimo_s": round(min(duracoes), 6),
+            "cpu_s": round(statistics.median(m["cpu_s"] for m in medidas), 6),
+            "rss_pico_mb": medidas[-1]["rss_pico_mb"],
+            "linhas_entrada": medidas[-1]["linhas_entrada"],
+            "linhas_saida": medidas[-1]["linhas_saida"],
+        }
+    return resumo
+
+
+def _commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=RAIZ, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def carregar_resultados(caminho: str = CAMINHO_RESULTADOS) -> list:
+    if not os.path.exists(caminho):
+        return []
+    with open(caminho, encoding="utf-8") as f:
+        return [json.loads(linha) for linha in f if linha.strip()]
+
+
+def comparar(atual: dict, anterior: dict, limiar: float = LIMIAR_REGRESSAO) -> list:
+    """Imprime a comparação por etapa (medianas) e devolve as etapas com regressão."""
+    print(f"\nComparação com {anterior['data']} (commit {anterior.get('commit')}):")
+    regressoes = []
+
+    for etapa in ETAPAS:
+        antes = anterior["etapas"].get(etapa, {}).get("mediana_s")
+        depois = atual["etapas"][etapa]["mediana_s"]
+        if not antes:
+            continue
+
+        razao = depois / antes
+        marca = ""
+        if razao > 1 + limiar:
+            marca = "  ✗ REGRESSÃO"
+            regressoes.append(etapa)
+        elif razao < 1 - limiar:
+            marca = "  ✓ mais rápida"
+        print(f"  {etapa:<20} {antes:9.3f} s → {depois:9.3f} s ({razao:5.2f}x){marca}")
+
+    return regressoes
+
+
+if __name__ == "__main__":
+    argumentos = argparse.ArgumentParser(description="Benchmark das etapas do pipeline ETL.")
+    argumentos.add_argument("--linhas", type=int, default=100_000)
+    argumentos.add_argument("--trimestres", type=int, default=3)
+    argumentos.add_argument("--formato", choices=["csv", "xlsx", "misto"], default="csv")
+    argumentos.add_argument("--semente", type=int, default=42)
+    argumentos.add_argument("--repeticoes", type=int, default=3)
+    argumentos.add_argument("--limiar", type=float, default=LIMIAR_REGRESSAO, help="Fração acima da qual uma etapa é regressão")
+    argumentos.add_argument("--estrito", action="store_true", help="Sai com código 1 se houver regressão")
+    argumentos.add_argument("--verboso", action="store_true", help="Mostra o log das etapas")
+    argumentos.add_argument("--resultados", default=CAMINHO_RESULTADOS)
+    args = argumentos.parse_args()
+
+    conjunto = preparar_dados(args.linhas, args.trimestres, args.formato, args.semente)
+    caminho_cadastro = os.path.abspath(conjunto["cadastro"])
+
+    # Sem cache de arquivos: cada repetição lê e normaliza tudo de novo
+    parser.USAR_CACHE_ARQUIVOS = False
+    configurar()
+
+    diretorio_original = os.getcwd()
+    trabalho = tempfile.mkdtemp(prefix="benchmark_etl_")
+    execucoes = []
+
+    try:
+        # Caminhos relativos do pipeline (data/cache...) ficam na pasta temporária
+        os.chdir(trabalho)
+        periodos = extrair(conjunto, "extraido")
+
+        for repeticao in range(1, args.repeticoes + 1):
+            saida = f"saida_{repeticao}"
+            with nullcontext() if args.verboso else redirect_stdout(io.StringIO()):
+                execucoes.append(executar_uma_vez(periodos, "extraido", caminho_cadastro, saida))
+            shutil.rmtree(saida, ignore_errors=True)
+            # Caches gravados pelas etapas (cadastro, partições...) não
+            # podem servir a repetição seguinte
+            shutil.rmtree(os.path.join("data", "cache"), ignore_errors=True)
+
+            tempos = ", ".join(f"{e}={execucoes[-1][e]['duracao_s']:.3f}s" for e in ETAPAS)
+            print(f"Repetição {repeticao}/{args.repeticoes}: {tempos}")
+    finally:
+        os.chdir(diretorio_original)
+        shutil.rmtree(trabalho, ignore_errors=True)
+
+    parametros = {
+        "linhas": args.linhas,
+        "trimestres": args.trimestres,
+        "formato": args.formato,
+        "semente": args.semente,
+    }
+    resultado = {
+        "data": datetime.now().isoformat(timespec="seconds"),
+        "commit": _commit(),
+        "parametros": parametros,
+        "repeticoes": args.repeticoes,
+        "ambiente": {
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "numpy": np.__version__,
+            "cpus": os.cpu_count(),
+            "sistema": platform.platform(),
+        },
+        "etapas": resumir(execucoes),
+    }
+
+    print(f"\n{'Etapa':<20} {'mediana':>9} {'mínimo':>9} {'CPU':>9} {'RSS pico':>10} {'linhas':>12}")
+    for etapa, dados in resultado["etapas"].items():
+        print(
+            f"{etapa:<20} {dados['mediana_s']:8.3f}s {dados['minimo_s']:8.3f}s {dados['cpu_s']:8.3f}s "
+            f"{dados['rss_pico_mb'] or 0:8.1f}MB {dados['linhas_saida'] or dados['linhas_entrada'] or 0:>12}"
+        )
+
+    anteriores = [r for r in carregar_resultados(args.resultados) if r.get("parametros") == parametros]
+    regressoes = comparar(resultado, anteriores[-1], args.limiar) if anteriores else []
+
+    os.makedirs(os.path.dirname(args.resultados) or ".", exist_ok=True)
+    with open(args.resultados, "a", encoding="utf-8") as f:
+        f.write(json.dumps(resultado, ensure_ascii=False) + "\n")
+    print(f"\nResultado salvo em: {args.resultados}")
+
+    if regressoes and args.estrito:
+        sys.exit(1)
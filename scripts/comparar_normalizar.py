@@ -0,0 +1,230 @@
+"""
+Confere a normalização vetorizada contra a versão original linha a linha
+(`normalizar`, com iterrows + float()).
+Uso: python scripts/comparar_normalizar.py [linhas]
+
+Roda casos de borda (nulos, 'nan', '1_000', 'inf', malformados misturados
+com válidos, colunas numéricas, colunas ausentes, arquivo sem a descrição
+alvo) e uma amostra aleatória de duas formas:
+- em memória: `normalizar_em_chunks` (arquivo inteiro e em blocos) contra
+  a normalização original sobre o mesmo DataFrame;
+- por arquivo: cada caso gravado como CSV da ANS e lido por
+  `processar_arquivo` contra a leitura original (read_csv) + normalização.
+Os valores são comparados bit a bit. Sai com código 1 se alguma saída divergir.
+"""
+import csv
+import os
+import sys
+import tempfile
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+from src import parser
+from src.parser import DESCRICAO_FILTRO, normalizar_em_chunks, processar_arquivo
+
+LINHAS = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+ALVO = DESCRICAO_FILTRO
+# Casos fora da comparação por arquivo: o read_csv original inferia
+# REG_ANS como float quando a coluna tinha vazios ('7' virava '7.0');
+# o leitor em blocos lê a coluna como texto
+FORA_DA_COMPARACAO_POR_ARQUIVO = {"nulos"}
+
+
+def ler_arquivo_original(caminho: str) -> pd.DataFrame:
+    """Leitura original de CSV (arquivo inteiro, tipos inferidos pelo pandas)."""
+    return pd.read_csv(caminho, sep=";", encoding="latin1")
+
+
+def normalizar_linha_a_linha(df: pd.DataFrame, ano: int, trimestre: str) -> list:
+    """Versão original da normalização (uma linha por vez), usada como referência."""
+    registros = []
+
+    for coluna in ["DESCRICAO", "REG_ANS", "VL_SALDO_FINAL"]:
+        if coluna not in df.columns:
+            return registros
+
+    if not (df["DESCRICAO"] == DESCRICAO_FILTRO).any():
+        return registros
+
+    for _, row in df.iterrows():
+        try:
+            valor = float(
+                str(row["VL_SALDO_FINAL"])
+                .replace(".", "")
+                .replace(",", ".")
+            )
+        except Exception:
+            continue
+
+        registros.append({
+            "REG_ANS": str(row["REG_ANS"]).strip(),
+            "Ano": ano,
+            "Trimestre": trimestre,
+            "ValorDespesas": valor
+        })
+
+    return registros
+
+
+def _como_registros(lote: pd.DataFrame) -> list:
+    """Lote colunar -> lista de tuplas; o valor vira os bits do float64."""
+    valores = lote["ValorDespesas"].to_numpy(dtype=np.float64).view(np.uint64)
+    return list(zip(
+        lote["REG_ANS"].astype(str),
+        lote["Ano"].astype(int),
+        lote["Trimestre"].astype(str),
+        valores.tolist()
+    ))
+
+
+def _referencia(registros: list) -> list:
+    return [
+        (r["REG_ANS"], r["Ano"], str(r["Trimestre"]), np.float64(r["ValorDespesas"]).view(np.uint64).item())
+        for r in registros
+    ]
+
+
+def casos_de_borda() -> dict:
+    return {
+        "valores_br": pd.DataFrame({
+            "DESCRICAO": [ALVO, "Outra", ALVO],
+            "REG_ANS": ["123456", " 654321 ", "123456"],
+            "VL_SALDO_FINAL": ["1.234,56", "-0,01", "0,00"],
+        }),
+        "nan_e_malformado": pd.DataFrame({
+            "DESCRICAO": [ALVO] * 6,
+            "REG_ANS": ["1", "2", "3", "4", "5", "6"],
+            "VL_SALDO_FINAL": ["nan", "1_000", "abc", "inf", "", "-0"],
+        }),
+        "nulos": pd.DataFrame({
+            "DESCRICAO": [ALVO, None, ALVO],
+            "REG_ANS": [None, "7", np.nan],
+            "VL_SALDO_FINAL": [None, np.nan, "12,5"],
+        }),
+        "notacao_cientifica": pd.DataFrame({
+            "DESCRICAO": [ALVO] * 4,
+            "REG_ANS": ["1", "2", "3", "4"],
+            "VL_SALDO_FINAL": ["1e3", "1,5E-2", " 42 ", "0x10"],
+        }),
+        "coluna_float": pd.DataFrame({
+            "DESCRICAO": [ALVO, ALVO, ALVO],
+            "REG_ANS": [123456, 654321, 111111],
+            "VL_SALDO_FINAL": [1234.5, np.nan, -0.25],
+        }),
+        "coluna_int": pd.DataFrame({
+            "DESCRICAO": [ALVO, ALVO],
+            "REG_ANS": ["1", "2"],
+            "VL_SALDO_FINAL": [10, -3],
+        }),
+        "categorias": pd.DataFrame({
+            "DESCRICAO": pd.Categorical([ALVO, "Outra", ALVO]),
+            "REG_ANS": pd.Categorical([" 9 ", "9", "10"]),
+            "VL_SALDO_FINAL": ["1,0", "2,0", "x"],
+        }),
+        "sem_descricao_alvo": pd.DataFrame({
+            "DESCRICAO": ["Outra", "Mais uma"],
+            "REG_ANS": ["1", "2"],
+            "VL_SALDO_FINAL": ["1,00", "2,00"],
+        }),
+        "coluna_ausente": pd.DataFrame({
+            "DESCRICAO": [ALVO],
+            "REG_ANS": ["1"],
+        }),
+        "vazio": pd.DataFrame({"DESCRICAO": [], "REG_ANS": [], "VL_SALDO_FINAL": []}),
+    }
+
+
+def amostra_aleatoria(linhas: int, semente: int = 42) -> pd.DataFrame:
+    rng = np.random.default_rng(semente)
+    centavos = rng.integers(-10**9, 10**11, linhas)
+    valores = np.array(
+        [f"{c // 100:,}".replace(",", ".") + f",{c % 100:02d}" for c in centavos],
+        dtype=object
+    )
+    # Alguns malformados, nulos e formas que só float() aceita
+    valores[::997] = "n/d"
+    valores[1::1009] = None
+    valores[2::1013] = "nan"
+
+    return pd.DataFrame({
+        "DESCRICAO": rng.choice(np.array([ALVO, "Outra despesa", "Receitas"], dtype=object), linhas),
+        "REG_ANS": rng.integers(300_000, 301_000, linhas).astype(str),
+        "VL_SALDO_FINAL": valores,
+    })
+
+
+def _comparar_saidas(nome: str, esperado: list, saidas: dict) -> bool:
+    iguais = True
+
+    for versao, lote in saidas.items():
+        obtido = _como_registros(lote)
+        if obtido != esperado:
+            iguais = False
+            print(f"  ✗ {nome} ({versao}): {len(obtido)} registros, esperado {len(esperado)}")
+            for a, b in zip(obtido, esperado):
+                if a != b:
+                    print(f"      obtido {a} / esperado {b}")
+                    break
+
+    if iguais:
+        print(f"  ✓ {nome} ({len(esperado)} registros)")
+    return iguais
+
+
+def comparar(nome: str, df: pd.DataFrame) -> bool:
+    esperado = _referencia(normalizar_linha_a_linha(df, 2025, "1"))
+
+    saidas = {"arquivo inteiro": normalizar_em_chunks([df], 2025, "1")}
+    for tamanho in (1, 2, 1000):
+        blocos = [df.iloc[i:i + tamanho] for i in range(0, len(df), tamanho)]
+        saidas[f"blocos de {tamanho}"] = normalizar_em_chunks(blocos, 2025, "1")
+
+    return _comparar_saidas(nome, esperado, saidas)
+
+
+def comparar_arquivo(nome: str, df: pd.DataFrame, pasta: str) -> bool:
+    caminho = os.path.join(pasta, f"{nome}.csv")
+    df.to_csv(caminho, sep=";", index=False, encoding="latin1", quoting=csv.QUOTE_ALL)
+
+    esperado = _referencia(normalizar_linha_a_linha(ler_arquivo_original(caminho), 2025, "1"))
+    return _comparar_saidas(nome, esperado, {"processar_arquivo": processar_arquivo(caminho, 2025, "1")})
+
+
+if __name__ == "__main__":
+    casos = casos_de_borda()
+    amostra = amostra_aleatoria(LINHAS)
+
+    print("Casos de borda:")
+    resultados = [comparar(nome, df) for nome, df in casos.items()]
+
+    print(f"\nAmostra aleatória ({LINHAS} linhas):")
+    resultados.append(comparar("aleatoria", amostra))
+
+    print("\nPor arquivo (CSV):")
+    # Sem cache de arquivos: cada caso é lido e normalizado de fato
+    parser.USAR_CACHE_ARQUIVOS = False
+    with tempfile.TemporaryDirectory(prefix="comparar_normalizar_") as pasta:
+        resultados += [
+            comparar_arquivo(nome, df, pasta)
+            for nome, df in {**casos, "aleatoria": amostra}.items()
+            if nome not in FORA_DA_COMPARACAO_POR_ARQUIVO
+        ]
+
+    inicio = time.perf_counter()
+    normalizar_linha_a_linha(amostra, 2025, "1")
+    tempo_linha = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    normalizar_em_chunks([amostra], 2025, "1")
+    tempo_vetorizado = time.perf_counter() - inicio
+
+    print(f"\nLinha a linha: {tempo_linha:.3f} s")
+    print(f"Vetorizado:    {tempo_vetorizado:.3f} s ({tempo_linha / tempo_vetorizado:.1f}x mais rápido)")
+
+    if not all(resultados):
+        print("\n✗ Saídas divergentes")
+        sys.exit(1)
+    print("\n✓ Saídas idênticas")
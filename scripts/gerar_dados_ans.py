@@ -0,0 +1,271 @@
+"""
+Gerador determinístico de dados sintéticos no formato da ANS.
+Uso: python scripts/gerar_dados_ans.py [--linhas N] [--trimestres N] [--formato csv|xlsx|misto] [--destino PASTA]
+
+Gera, com a mesma semente, sempre os mesmos arquivos:
+- <destino>/demonstracoes_contabeis/AAAA/NTAAAA.zip: um ZIP por trimestre com
+  DATA, REG_ANS, CD_CONTA_CONTABIL, DESCRICAO, VL_SALDO_INICIAL e VL_SALDO_FINAL
+  (CSV latin1 com aspas, ou XLSX) e valores no formato BR ("1.234,56")
+- <destino>/operadoras_de_plano_de_saude_ativas/Relatorio_cadop.csv: cadastro
+  com as operadoras usadas nos trimestres (algumas ficam de fora, algumas
+  com CNPJ inválido, para exercitar enriquecimento e validação)
+
+A estrutura espelha o FTP da ANS, então a pasta pode ser servida com
+`python -m http.server`. Escalas de 10 mil a 50 milhões de linhas: os
+arquivos são escritos em blocos, sem montar o trimestre inteiro em memória.
+"""
+import argparse
+import csv
+import io
+import os
+import zipfile
+
+import numpy as np
+import pandas as pd
+
+# Linhas por bloco gerado/escrito
+TAMANHO_BLOCO = 500_000
+# Limite de linhas de dados por planilha XLSX (o formato aceita 1.048.576)
+LINHAS_POR_XLSX = 1_000_000
+
+COLUNAS = ["DATA", "REG_ANS", "CD_CONTA_CONTABIL", "DESCRICAO", "VL_SALDO_INICIAL", "VL_SALDO_FINAL"]
+
+# Contas contábeis: (código, descrição, peso)
+CONTAS = [
+    ("41", "Despesas com Eventos / Sinistros", 0.18),
+    ("411", "Eventos Indenizáveis Líquidos", 0.10),
+    ("31", "Contraprestações Efetivas de Plano de Assistência à Saúde", 0.14),
+    ("311", "Receitas com Operações de Assistência à Saúde", 0.10),
+    ("43", "Despesas de Comercialização", 0.08),
+    ("46", "Despesas Administrativas", 0.12),
+    ("12", "Aplicações Financeiras", 0.10),
+    ("21", "Provisões Técnicas de Operações de Assistência à Saúde", 0.10),
+    ("25", "Patrimônio Líquido", 0.08),
+]
+
+MODALIDADES = ["Medicina de Grupo", "Cooperativa Médica", "Autogestão", "Seguradora Especializada em Saúde", "Odontologia de Grupo", "Filantropia"]
+UFS = ["SP", "RJ", "MG", "RS", "PR", "SC", "BA", "PE", "CE", "GO", "DF", "ES", "PA", "MT", "MS"]
+
+# Fração de operadoras que aparecem nos demonstrativos mas não no cadastro
+# e fração do cadastro com CNPJ inválido
+FRACAO_SEM_CADASTRO = 0.08
+FRACAO_CNPJ_INVALIDO = 0.03
+
+
+def _cnpj(base: np.ndarray) -> str:
+    """CNPJ com dígitos verificadores a partir de 12 dígitos."""
+    digitos = list(base)
+    for peso in ([5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2], [6, 5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2]):
+        resto = sum(int(d) * p for d, p in zip(digitos, peso)) % 11
+        digitos.append(0 if resto < 2 else 11 - resto)
+    return "".join(str(d) for d in digitos)
+
+
+def gerar_operadoras(quantidade: int, semente: int = 42) -> pd.DataFrame:
+    """
+    Operadoras sintéticas: registro ANS, CNPJ, razão social, modalidade e UF.
+
+    A coluna "cadastrada" indica se a operadora entra no Relatorio_cadop.csv.
+    """
+    rng = np.random.default_rng(semente)
+    registros = 300000 + np.arange(quantidade) * 7 + rng.integers(0, 7, quantidade)
+
+    cnpjs = [_cnpj(base) for base in rng.integers(0, 10, (quantidade, 12))]
+    invalidos = rng.random(quantidade) < FRACAO_CNPJ_INVALIDO
+    cnpjs = [c[:-1] + str((int(c[-1]) + 1) % 10) if inv else c for c, inv in zip(cnpjs, invalidos)]
+
+    return pd.DataFrame({
+        "REGISTRO_OPERADORA": registros.astype(str),
+        "CNPJ": cnpjs,
+        "Razao_Social": [f"OPERADORA SINTÉTICA {i} SAÚDE LTDA" for i in range(quantidade)],
+        "Nome_Fantasia": [f"SINTÉTICA {i}" for i in range(quantidade)],
+        "Modalidade": rng.choice(MODALIDADES, quantidade),
+        "UF": rng.choice(UFS, quantidade, p=np.linspace(3, 1, len(UFS)) / np.linspace(3, 1, len(UFS)).sum()),
+        "cadastrada": rng.random(quantidade) >= FRACAO_SEM_CADASTRO,
+    })
+
+
+def salvar_cadastro(operadoras: pd.DataFrame, caminho: str) -> str:
+    """Grava o Relatorio_cadop.csv (latin1, ';', todos os campos entre aspas)."""
+    os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+    cadastro = operadoras[operadoras["cadastrada"]].drop(columns="cadastrada")
+    cadastro = cadastro.assign(
+        Cidade="SÃO PAULO",
+        Data_Registro_ANS="2001-01-01"
+    )
+    cadastro.to_csv(caminho, sep=";", index=False, encoding="latin1", quoting=csv.QUOTE_ALL)
+    return caminho
+
+
+def _formatar_br(valores: np.ndarray) -> np.ndarray:
+    """Formata valores como '1.234.567,89' (milhar com ponto, decimal com vírgula)."""
+    centavos = np.round(np.abs(valores) * 100).astype(np.int64)
+    sinal = np.where(valores < 0, "-", "")
+    return np.array([
+        f"{s}{c // 100:,}".replace(",", ".") + f",{c % 100:02d}"
+        for s, c in zip(sinal, centavos)
+    ], dtype=object)
+
+
+def gerar_bloco(rng: np.random.Generator, linhas: int, registros: np.ndarray, data: str) -> pd.DataFrame:
+    """Um bloco de linhas de demonstrativo contábil de um trimestre."""
+    pesos = np.array([p for _, _, p in CONTAS])
+    contas = rng.choice(len(CONTAS), linhas, p=pesos / pesos.sum())
+
+    # Valores log-normais (a maioria de milhares a milhões), com zerados e negativos
+    finais = rng.lognormal(mean=11, sigma=2.2, size=linhas)
+    finais[rng.random(linhas) < 0.10] = 0.0
+    negativos = rng.random(linhas) < 0.05
+    finais[negativos] = -finais[negativos]
+    iniciais = finais * rng.uniform(0.5, 1.0, linhas)
+
+    codigos = np.array([c for c, _, _ in CONTAS], dtype=object)
+    descricoes = np.array([d for _, d, _ in CONTAS], dtype=object)
+
+    return pd.DataFrame({
+        "DATA": data,
+        "REG_ANS": rng.choice(registros, linhas),
+        "CD_CONTA_CONTABIL": codigos[contas],
+        "DESCRICAO": descricoes[contas],
+        "VL_SALDO_INICIAL": _formatar_br(iniciais),
+        "VL_SALDO_FINAL": _formatar_br(finais),
+    })
+
+
+def _blocos(rng, linhas: int, registros, data: str):
+    for inicio in range(0, linhas, TAMANHO_BLOCO):
+        yield gerar_bloco(rng, min(TAMANHO_BLOCO, linhas - inicio), registros, data)
+
+
+def _escrever_csv(zip_ref: zipfile.ZipFile, nome: str, blocos) -> None:
+    with zip_ref.open(nome, "w", force_zip64=True) as membro:
+        texto = io.TextIOWrapper(membro, encoding="latin1", newline="")
+        for i, bloco in enumerate(blocos):
+            bloco.to_csv(texto, sep=";", index=False, header=i == 0, quoting=csv.QUOTE_ALL)
+        texto.flush()
+        texto.detach()
+
+
+def _escrever_xlsx(zip_ref: zipfile.ZipFile, nome: str, blocos) -> None:
+    from openpyxl import Workbook
+
+    livro = Workbook(write_only=True)
+    planilha = livro.create_sheet("Demonstracoes")
+    planilha.append(COLUNAS)
+    for bloco in blocos:
+        for linha in bloco.itertuples(index=False):
+            planilha.append(list(linha))
+
+    # Grava direto no membro do ZIP: a planilha nunca fica inteira em memória
+    with zip_ref.open(nome, "w", force_zip64=True) as membro:
+        livro.save(membro)
+
+
+def gerar_trimestre(
+    caminho_zip: str,
+    ano: int,
+    trimestre: int,
+    linhas: int,
+    registros: np.ndarray,
+    formato: str = "csv",
+    semente: int = 42
+) -> str:
+    """
+    Gera o ZIP de um trimestre (NTAAAA.zip) com um CSV, ou XLSX de até
+    LINHAS_POR_XLSX linhas cada.
+    """
+    os.makedirs(os.path.dirname(caminho_zip) or ".", exist_ok=True)
+    rng = np.random.default_rng([semente, ano, trimestre])
+    data = f"{ano}-{3 * (trimestre - 1) + 1:02d}-01"
+    nome = f"{trimestre}T{ano}"
+
+    temporario = caminho_zip + ".tmp"
+    with zipfile.ZipFile(temporario, "w", compression=zipfile.ZIP_DEFLATED) as zip_ref:
+        if formato == "xlsx":
+            for parte, inicio in enumerate(range(0, linhas, LINHAS_POR_XLSX), start=1):
+                tamanho = min(LINHAS_POR_XLSX, linhas - inicio)
+                _escrever_xlsx(zip_ref, f"{nome}_{parte}.xlsx", _blocos(rng, tamanho, registros, data))
+        else:
+            _escrever_csv(zip_ref, f"{nome}.csv", _blocos(rng, linhas, registros, data))
+
+    os.replace(temporario, caminho_zip)
+    return caminho_zip
+
+
+def gerar_dataset(
+    destino: str,
+    linhas: int = 100_000,
+    trimestres: int = 3,
+    formato: str = "csv",
+    operadoras: int = None,
+    semente: int = 42,
+    ano_final: int = 2025,
+    trimestre_final: int = 3
+) -> dict:
+    """
+    Gera `trimestres` ZIPs (terminando em trimestre_final/ano_final) com
+    `linhas` linhas no total e o cadastro correspondente.
+
+    Args:
+        destino: Pasta raiz (estrutura do FTP da ANS).
+        linhas: Total de linhas dos demonstrativos, dividido entre os trimestres.
+        trimestres: Quantidade de trimestres.
+        formato: "csv", "xlsx" ou "misto" (o último trimestre em XLSX).
+        operadoras: Quantidade de operadoras (padrão: proporcional às linhas,
+            entre 200 e 1.500, como no cadastro real).
+        semente: Semente do gerador.
+
+    Returns:
+        Dicionário com "trimestres" [(ano, trimestre, caminho_zip)] e "cadastro".
+    """
+    if formato not in ("csv", "xlsx", "misto"):
+        raise ValueError(f"Formato inválido: {formato}")
+
+    operadoras = operadoras or int(np.clip(linhas // 200, 200, 1_500))
+    df_operadoras = gerar_operadoras(operadoras, semente)
+    registros = df_operadoras["REGISTRO_OPERADORA"].to_numpy()
+
+    periodos = []
+    ano, trimestre = ano_final, trimestre_final
+    for _ in range(trimestres):
+        periodos.append((ano, trimestre))
+        ano, trimestre = (ano, trimestre - 1) if trimestre > 1 else (ano - 1, 4)
+    periodos.reverse()
+
+    gerados = []
+    for i, (ano, trimestre) in enumerate(periodos):
+        linhas_trimestre = linhas // trimestres + (1 if i < linhas % trimestres else 0)
+        formato_trimestre = "xlsx" if formato == "xlsx" or (formato == "misto" and i == len(periodos) - 1) else "csv"
+        caminho_zip = os.path.join(destino, "demonstracoes_contabeis", str(ano), f"{trimestre}T{ano}.zip")
+        gerar_trimestre(caminho_zip, ano, trimestre, linhas_trimestre, registros, formato_trimestre, semente)
+        print(f"  ✓ {caminho_zip} ({linhas_trimestre} linhas, {formato_trimestre})")
+        gerados.append((ano, trimestre, caminho_zip))
+
+    cadastro = salvar_cadastro(
+        df_operadoras,
+        os.path.join(destino, "operadoras_de_plano_de_saude_ativas", "Relatorio_cadop.csv")
+    )
+    print(f"  ✓ {cadastro} ({int(df_operadoras['cadastrada'].sum())} operadoras)")
+
+    return {"trimestres": gerados, "cadastro": cadastro}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gera dados sintéticos no formato da ANS.")
+    parser.add_argument("--linhas", type=int, default=100_000, help="Total de linhas dos demonstrativos")
+    parser.add_argument("--trimestres", type=int, default=3)
+    parser.add_argument("--formato", choices=["csv", "xlsx", "misto"], default="csv")
+    parser.add_argument("--operadoras", type=int, default=None)
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--destino", default="data/sintetico")
+    args = parser.parse_args()
+
+    print(f"Gerando {args.linhas} linhas em {args.trimestres} trimestres ({args.formato})...")
+    gerar_dataset(
+        args.destino,
+        linhas=args.linhas,
+        trimestres=args.trimestres,
+        formato=args.formato,
+        operadoras=args.operadoras,
+        semente=args.semente
+    )
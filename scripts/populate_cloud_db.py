@@ -73,12 +73,86 @@ CREATE TABLE IF NOT EXISTS despesas_agregadas (
     desvio_padrao     NUMERIC(18,2)
 );
 
+-- Cubo de despesas validadas (data/output/cubo, ver src/cubo.py)
+CREATE TABLE IF NOT EXISTS cubo_despesas (
+    registro_ans      VARCHAR(20) NOT NULL,
+    razao_social      VARCHAR(255) NOT NULL,
+    uf                CHAR(2) NOT NULL,
+    modalidade        VARCHAR(100),
+    ano               INTEGER NOT NULL,
+    trimestre         INTEGER NOT NULL,
+    valor_despesas    NUMERIC(18,2) NOT NULL,
+    registros         INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS cubo_despesas_operadora (
+    registro_ans        VARCHAR(20) NOT NULL,
+    razao_social        VARCHAR(255) NOT NULL,
+    uf                  CHAR(2) NOT NULL,
+    modalidade          VARCHAR(100),
+    valor_despesas      NUMERIC(18,2) NOT NULL,
+    registros           INTEGER NOT NULL,
+    trimestres          INTEGER NOT NULL,
+    primeiro_ano        INTEGER NOT NULL,
+    primeiro_trimestre  INTEGER NOT NULL,
+    primeiro_valor      NUMERIC(18,2) NOT NULL,
+    ultimo_ano          INTEGER NOT NULL,
+    ultimo_trimestre    INTEGER NOT NULL,
+    ultimo_valor        NUMERIC(18,2) NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS cubo_despesas_uf (
+    uf                CHAR(2) NOT NULL,
+    valor_despesas    NUMERIC(18,2) NOT NULL,
+    registros         INTEGER NOT NULL,
+    operadoras        INTEGER NOT NULL,
+    razoes_sociais    INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS cubo_despesas_modalidade (
+    modalidade        VARCHAR(100),
+    valor_despesas    NUMERIC(18,2) NOT NULL,
+    registros         INTEGER NOT NULL,
+    operadoras        INTEGER NOT NULL,
+    razoes_sociais    INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS cubo_despesas_periodo (
+    ano               INTEGER NOT NULL,
+    trimestre         INTEGER NOT NULL,
+    valor_despesas    NUMERIC(18,2) NOT NULL,
+    registros         INTEGER NOT NULL,
+    operadoras        INTEGER NOT NULL,
+    razoes_sociais    INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS cubo_despesas_uf_periodo (
+    uf                CHAR(2) NOT NULL,
+    ano               INTEGER NOT NULL,
+    trimestre         INTEGER NOT NULL,
+    valor_despesas    NUMERIC(18,2) NOT NULL,
+    registros         INTEGER NOT NULL,
+    operadoras        INTEGER NOT NULL,
+    razoes_sociais    INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS cubo_despesas_uf_modalidade (
+    uf                CHAR(2) NOT NULL,
+    modalidade        VARCHAR(100),
+    valor_despesas    NUMERIC(18,2) NOT NULL,
+    registros         INTEGER NOT NULL,
+    operadoras        INTEGER NOT NULL,
+    razoes_sociais    INTEGER NOT NULL
+);
+
 -- Índices
 CREATE INDEX IF NOT EXISTS idx_operadoras_uf ON operadoras (uf);
 CREATE INDEX IF NOT EXISTS idx_operadoras_cnpj ON operadoras (cnpj);
 CREATE INDEX IF NOT EXISTS idx_despesas_periodo ON despesas_consolidadas (ano, trimestre);
 CREATE INDEX IF NOT EXISTS idx_despesas_registro_ans ON despesas_consolidadas (registro_ans);
 CREATE INDEX IF NOT EXISTS idx_agregadas_uf ON despesas_agregadas (uf);
+CREATE INDEX IF NOT EXISTS idx_cubo_registro_ans ON cubo_despesas (registro_ans);
+CREATE INDEX IF NOT EXISTS idx_cubo_uf_periodo ON cubo_despesas (uf, ano, trimestre);
 """
 
 print("Criando tabelas...")
@@ -93,7 +167,11 @@ print("Tabelas criadas!")
 # Limpar tabelas antes de inserir (para permitir re-execução)
 print("Limpando tabelas existentes...")
 with engine.connect() as conn:
-    conn.execute(text("TRUNCATE TABLE despesas_agregadas, despesas_consolidadas, operadoras CASCADE"))
+    conn.execute(text(
+        "TRUNCATE TABLE despesas_agregadas, despesas_consolidadas, operadoras, "
+        "cubo_despesas, cubo_despesas_operadora, cubo_despesas_uf, cubo_despesas_modalidade, "
+        "cubo_despesas_periodo, cubo_despesas_uf_periodo, cubo_despesas_uf_modalidade CASCADE"
+    ))
     conn.commit()
 print("Tabelas limpas!")
 
@@ -190,4 +268,36 @@ importar_csv(
     }
 )
 
+# Cubo de despesas - mesmo mapeamento para todas as tabelas do cubo
+MAPEAMENTO_CUBO = {
+    "RegistroANS": "registro_ans",
+    "RazaoSocial": "razao_social",
+    "UF": "uf",
+    "Modalidade": "modalidade",
+    "Ano": "ano",
+    "Trimestre": "trimestre",
+    "ValorDespesas": "valor_despesas",
+    "Registros": "registros",
+    "Operadoras": "operadoras",
+    "RazoesSociais": "razoes_sociais",
+    "Trimestres": "trimestres",
+    "PrimeiroAno": "primeiro_ano",
+    "PrimeiroTrimestre": "primeiro_trimestre",
+    "PrimeiroValor": "primeiro_valor",
+    "UltimoAno": "ultimo_ano",
+    "UltimoTrimestre": "ultimo_trimestre",
+    "UltimoValor": "ultimo_valor"
+}
+
+for tabela in [
+    "cubo_despesas",
+    "cubo_despesas_operadora",
+    "cubo_despesas_uf",
+    "cubo_despesas_modalidade",
+    "cubo_despesas_periodo",
+    "cubo_despesas_uf_periodo",
+    "cubo_despesas_uf_modalidade"
+]:
+    importar_csv(tabela, os.path.join("cubo", f"{tabela}.csv"), MAPEAMENTO_CUBO)
+
 print("\n✓ Banco populado com sucesso!")
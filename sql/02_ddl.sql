@@ -83,3 +83,85 @@ CREATE INDEX idx_agregadas_uf
 
 CREATE INDEX idx_agregadas_periodo
     ON despesas_agregadas (ano, trimestre);
+
+
+-- =========================
+-- TABELAS: cubo_despesas*
+-- Cubo pré-agregado de despesas validadas (data/output/cubo, ver src/cubo.py)
+-- =========================
+CREATE TABLE cubo_despesas (
+    registro_ans      VARCHAR(20) NOT NULL,
+    razao_social      VARCHAR(255) NOT NULL,
+    uf                CHAR(2) NOT NULL,
+    modalidade        VARCHAR(100),
+    ano               INTEGER NOT NULL,
+    trimestre         INTEGER NOT NULL,
+    valor_despesas    NUMERIC(18,2) NOT NULL,
+    registros         INTEGER NOT NULL
+);
+
+CREATE INDEX idx_cubo_registro_ans
+    ON cubo_despesas (registro_ans);
+
+CREATE INDEX idx_cubo_uf_periodo
+    ON cubo_despesas (uf, ano, trimestre);
+
+CREATE TABLE cubo_despesas_operadora (
+    registro_ans        VARCHAR(20) NOT NULL,
+    razao_social        VARCHAR(255) NOT NULL,
+    uf                  CHAR(2) NOT NULL,
+    modalidade          VARCHAR(100),
+    valor_despesas      NUMERIC(18,2) NOT NULL,
+    registros           INTEGER NOT NULL,
+    trimestres          INTEGER NOT NULL,
+    primeiro_ano        INTEGER NOT NULL,
+    primeiro_trimestre  INTEGER NOT NULL,
+    primeiro_valor      NUMERIC(18,2) NOT NULL,
+    ultimo_ano          INTEGER NOT NULL,
+    ultimo_trimestre    INTEGER NOT NULL,
+    ultimo_valor        NUMERIC(18,2) NOT NULL
+);
+
+CREATE TABLE cubo_despesas_uf (
+    uf                CHAR(2) NOT NULL,
+    valor_despesas    NUMERIC(18,2) NOT NULL,
+    registros         INTEGER NOT NULL,
+    operadoras        INTEGER NOT NULL,
+    razoes_sociais    INTEGER NOT NULL
+);
+
+CREATE TABLE cubo_despesas_modalidade (
+    modalidade        VARCHAR(100),
+    valor_despesas    NUMERIC(18,2) NOT NULL,
+    registros         INTEGER NOT NULL,
+    operadoras        INTEGER NOT NULL,
+    razoes_sociais    INTEGER NOT NULL
+);
+
+CREATE TABLE cubo_despesas_periodo (
+    ano               INTEGER NOT NULL,
+    trimestre         INTEGER NOT NULL,
+    valor_despesas    NUMERIC(18,2) NOT NULL,
+    registros         INTEGER NOT NULL,
+    operadoras        INTEGER NOT NULL,
+    razoes_sociais    INTEGER NOT NULL
+);
+
+CREATE TABLE cubo_despesas_uf_periodo (
+    uf                CHAR(2) NOT NULL,
+    ano               INTEGER NOT NULL,
+    trimestre         INTEGER NOT NULL,
+    valor_despesas    NUMERIC(18,2) NOT NULL,
+    registros         INTEGER NOT NULL,
+    operadoras        INTEGER NOT NULL,
+    razoes_sociais    INTEGER NOT NULL
+);
+
+CREATE TABLE cubo_despesas_uf_modalidade (
+    uf                CHAR(2) NOT NULL,
+    modalidade        VARCHAR(100),
+    valor_despesas    NUMERIC(18,2) NOT NULL,
+    registros         INTEGER NOT NULL,
+    operadoras        INTEGER NOT NULL,
+    razoes_sociais    INTEGER NOT NULL
+);
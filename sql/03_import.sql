@@ -18,3 +18,15 @@
 -- IMPORTAÇÃO: despesas agregadas
 -- ===============================
 \copy despesas_agregadas (cnpj, razao_social, trimestre, ano, valor_despesas, media_trimestral, desvio_padrao, registro_ans, modalidade, uf) FROM 'data/output/despesas_agregadas.csv' DELIMITER ';' CSV HEADER ENCODING 'UTF8';
+
+
+-- ===============================
+-- IMPORTAÇÃO: cubo de despesas
+-- ===============================
+\copy cubo_despesas (registro_ans, razao_social, uf, modalidade, ano, trimestre, valor_despesas, registros) FROM 'data/output/cubo/cubo_despesas.csv' DELIMITER ';' CSV HEADER ENCODING 'UTF8';
+\copy cubo_despesas_operadora (registro_ans, razao_social, uf, modalidade, valor_despesas, registros, trimestres, primeiro_ano, primeiro_trimestre, primeiro_valor, ultimo_ano, ultimo_trimestre, ultimo_valor) FROM 'data/output/cubo/cubo_despesas_operadora.csv' DELIMITER ';' CSV HEADER ENCODING 'UTF8';
+\copy cubo_despesas_uf (uf, valor_despesas, registros, operadoras, razoes_sociais) FROM 'data/output/cubo/cubo_despesas_uf.csv' DELIMITER ';' CSV HEADER ENCODING 'UTF8';
+\copy cubo_despesas_modalidade (modalidade, valor_despesas, registros, operadoras, razoes_sociais) FROM 'data/output/cubo/cubo_despesas_modalidade.csv' DELIMITER ';' CSV HEADER ENCODING 'UTF8';
+\copy cubo_despesas_periodo (ano, trimestre, valor_despesas, registros, operadoras, razoes_sociais) FROM 'data/output/cubo/cubo_despesas_periodo.csv' DELIMITER ';' CSV HEADER ENCODING 'UTF8';
+\copy cubo_despesas_uf_periodo (uf, ano, trimestre, valor_despesas, registros, operadoras, razoes_sociais) FROM 'data/output/cubo/cubo_despesas_uf_periodo.csv' DELIMITER ';' CSV HEADER ENCODING 'UTF8';
+\copy cubo_despesas_uf_modalidade (uf, modalidade, valor_despesas, registros, operadoras, razoes_sociais) FROM 'data/output/cubo/cubo_despesas_uf_modalidade.csv' DELIMITER ';' CSV HEADER ENCODING 'UTF8';
@@ -1,27 +1,342 @@
+import math
+import os
+import numpy as np
 import pandas as pd
-import zipfile
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
+from src.cubo import exportar_cubo
+from src.exportacao import exportar_csv
+from src.lotes import salvar_lote_parquet
+from src.manifest import artefato_atualizado, registrar_artefato
+
+# Estados parciais da agregação, um Parquet por trimestre. Cada linha
+# guarda contagem, soma e M2 (soma dos quadrados dos desvios) de um grupo
+# RazaoSocial/UF naquele trimestre; estados de trimestres diferentes são
+# combinados sem reler os registros de origem.
+PASTA_PARCIAIS = "data/cache/agregados"
+# Incrementar sempre que enriquecimento, validação ou agregação mudarem
+VERSAO_AGREGACAO = 2
+
+CHAVES_AGREGACAO = ["RazaoSocial", "UF"]
+CHAVES_PERIODO = ["Ano", "Trimestre"]
+# Campos de cadastro: valor do primeiro registro não nulo do grupo,
+# percorrendo os trimestres em ordem cronológica
+CAMPOS_CADASTRO = ["CNPJ", "RegistroANS", "Modalidade"]
+# Os valores de origem vêm em centavos; o total de cada grupo é
+# arredondado a elas para não depender da ordem das somas parciais
+CASAS_DECIMAIS_VALOR = 2
+
+
+def _preparar(df: pd.DataFrame) -> pd.DataFrame:
+    # Renomear colunas para o padrão correto
+    df = df.rename(columns={
+        "registro_operadora": "RegistroANS",
+        "uf": "UF",
+        "modalidade": "Modalidade"
+    })
+
+    # Garante tipo numérico
+    if not pd.api.types.is_numeric_dtype(df["ValorDespesas"]):
+        df = df.assign(ValorDespesas=pd.to_numeric(df["ValorDespesas"], errors="coerce"))
+
+    return df
+
+
+# Agregações do estado parcial de cada grupo/trimestre
+AGREGACOES_PARCIAIS = {
+    "Registros": ("ValorDespesas", "count"),
+    "Soma": ("ValorDespesas", "sum"),
+    "Variancia": ("ValorDespesas", "var"),
+    **{campo: (campo, "first") for campo in CAMPOS_CADASTRO},
+}
+
+
+def _finalizar_parciais(parciais: pd.DataFrame) -> pd.DataFrame:
+    # M2 = variância amostral * (n - 1); zero para grupos com um registro
+    parciais["M2"] = parciais["Variancia"].fillna(0.0) * (parciais["Registros"] - 1).clip(lower=0)
+
+    # Período como campos explícitos e comparáveis (Ano inteiro, Trimestre texto)
+    parciais["Ano"] = parciais["Ano"].astype(int)
+    parciais["Trimestre"] = parciais["Trimestre"].astype(str)
+
+    return parciais.drop(columns="Variancia")
+
+
+def calcular_parciais(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Estado parcial da agregação por RazaoSocial, UF, Ano e Trimestre.
+
+    Args:
+        df: DataFrame validado, já com colunas renomeadas (ver _preparar).
+
+    Returns:
+        DataFrame com as chaves, Registros (valores não nulos), Soma, M2 e
+        o primeiro valor não nulo de cada campo de cadastro.
+    """
+    parciais = (
+        df
+        .groupby(CHAVES_AGREGACAO + CHAVES_PERIODO, observed=True, sort=True)
+        .agg(**AGREGACOES_PARCIAIS)
+        .reset_index()
+    )
+
+    return _finalizar_parciais(parciais)
+
+
+def _agregar_particao(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    calcular_parciais de uma partição, agrupando por códigos inteiros.
+
+    RazaoSocial e UF são fatoradas (pd.factorize, valores únicos
+    ordenados) e combinadas em um único código inteiro; o groupby roda
+    sobre ele e o período, e os códigos são traduzidos de volta para as
+    chaves no resultado. Linhas com chave nula ficam de fora, como no
+    groupby pelas colunas de texto.
+    """
+    razoes, razoes_unicas = pd.factorize(df["RazaoSocial"], sort=True)
+    ufs, ufs_unicas = pd.factorize(df["UF"], sort=True)
+    total_ufs = max(len(ufs_unicas), 1)
+
+    codigo = razoes.astype(np.int64) * total_ufs + ufs
+    validas = (razoes >= 0) & (ufs >= 0)
+
+    parciais = (
+        df.assign(_Codigo=codigo)[validas]
+        .groupby(["_Codigo"] + CHAVES_PERIODO, observed=True, sort=True)
+        .agg(**AGREGACOES_PARCIAIS)
+        .reset_index()
+    )
+
+    codigos = parciais.pop("_Codigo").to_numpy()
+    parciais.insert(0, "RazaoSocial", razoes_unicas.take(codigos // total_ufs))
+    parciais.insert(1, "UF", ufs_unicas.take(codigos % total_ufs))
+
+    return _finalizar_parciais(parciais)
+
+
+def calcular_parciais_paralelo(df: pd.DataFrame, workers: int) -> pd.DataFrame:
+    """
+    calcular_parciais em map-reduce sobre um pool de processos.
+
+    As linhas são distribuídas por um hash de RazaoSocial/UF (hash %
+    workers), então cada grupo fica inteiro em uma partição; o processo
+    principal só calcula esse hash, em uma passada vetorizada. Cada
+    processo fatora as chaves da própria partição e agrega por código
+    inteiro (_agregar_particao), e os resultados são concatenados e
+    reordenados pelas chaves, como no groupby serial.
+
+    Args:
+        df: DataFrame validado, já com colunas renomeadas (ver _preparar).
+        workers: Número de processos (e de partições).
+
+    Returns:
+        Mesmo conteúdo de calcular_parciais, na mesma ordem.
+    """
+    chaves = CHAVES_AGREGACAO + CHAVES_PERIODO
+    colunas = chaves + ["ValorDespesas"] + CAMPOS_CADASTRO
+
+    hashes = pd.util.hash_pandas_object(df[CHAVES_AGREGACAO], index=False).to_numpy()
+    particao = hashes % np.uint64(workers)
+    partes = [df.loc[particao == i, colunas] for i in range(workers)]
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        parciais = pd.concat(executor.map(_agregar_particao, partes), ignore_index=True)
+
+    return parciais.sort_values(chaves, kind="stable").reset_index(drop=True)
+
+
+def _comparar_parciais(serial: pd.DataFrame, paralelo: pd.DataFrame) -> bool:
+    try:
+        pd.testing.assert_frame_equal(
+            serial.reset_index(drop=True),
+            paralelo.reset_index(drop=True),
+            check_dtype=False,
+            check_exact=True
+        )
+    except AssertionError as e:
+        print(f"      ✗ Agregação paralela diverge da serial: {e}")
+        return False
+
+    print("      ✓ Agregação paralela idêntica à serial")
+    return True
+
+
+def combinar_parciais(parciais: pd.DataFrame) -> pd.DataFrame:
+    """
+    Combina estados parciais em totais, médias e desvios padrão por grupo.
+
+    A soma e a contagem são somadas; o M2 é combinado pela fórmula de
+    Chan et al. (M2 = Σ M2ᵢ + nᵢ·(médiaᵢ - média)²), o que dá o mesmo
+    desvio padrão amostral de uma agregação sobre todos os registros.
+
+    As somas parciais são combinadas com math.fsum (soma compensada) e o
+    total é arredondado a CASAS_DECIMAIS_VALOR: somar por trimestre muda a
+    ordem das parcelas e deixaria resíduos de ponto flutuante no último
+    dígito (ex: 383719850.67999995 em vez de 383719850.68). A média
+    trimestral parte do total arredondado.
+
+    Ano e Trimestre são o primeiro período (cronológico) em que o grupo
+    aparece; os campos de cadastro vêm do primeiro período em que não
+    são nulos.
+
+    Returns:
+        DataFrame com RazaoSocial, UF, Ano, Trimestre, campos de cadastro,
+        ValorDespesas, MediaTrimestral e DesvPadrao.
+    """
+    parciais = parciais.sort_values(CHAVES_PERIODO, kind="stable")
+
+    grupos = parciais.groupby(CHAVES_AGREGACAO, sort=True)
+    registros = grupos["Registros"].transform("sum")
+    media = grupos["Soma"].transform("sum") / registros.where(registros > 0)
+
+    media_parcial = parciais["Soma"] / parciais["Registros"].where(parciais["Registros"] > 0)
+    desvio = (parciais["Registros"] * (media_parcial - media) ** 2).fillna(0.0)
+
+    combinado = (
+        parciais
+        .assign(M2=parciais["M2"] + desvio)
+        .groupby(CHAVES_AGREGACAO, as_index=False, sort=True)
+        .agg(
+            Ano=("Ano", "first"),
+            Trimestre=("Trimestre", "first"),
+            Registros=("Registros", "sum"),
+            ValorDespesas=("Soma", math.fsum),
+            M2=("M2", "sum"),
+            **{campo: (campo, "first") for campo in CAMPOS_CADASTRO}
+        )
+    )
+
+    combinado["ValorDespesas"] = combinado["ValorDespesas"].round(CASAS_DECIMAIS_VALOR)
+
+    n = combinado["Registros"]
+    combinado["MediaTrimestral"] = combinado["ValorDespesas"] / n.where(n > 0)
+    combinado["DesvPadrao"] = np.sqrt(combinado["M2"] / (n - 1).where(n > 1))
+
+    return combinado.drop(columns=["M2"])
+
+
+def _ler_parciais(caminho: str):
+    try:
+        return pd.read_parquet(caminho)
+    except (ImportError, OSError, ValueError) as e:
+        print(f"      Aviso: estado parcial ilegível, recalculando {caminho}: {e}")
+        return None
+
+
+def atualizar_parciais(
+    df: pd.DataFrame,
+    manifesto=None,
+    entradas=None,
+    pasta: str = PASTA_PARCIAIS,
+    workers: int = 1,
+    comparar: bool = False
+) -> pd.DataFrame:
+    """
+    Estados parciais de todos os trimestres do DataFrame validado.
+
+    Com `manifesto`, o estado de um trimestre é reaproveitado enquanto a
+    impressão digital do trimestre, o hash do cadastro e as versões não
+    mudarem; só os trimestres novos ou alterados são agregados (todos
+    juntos, em série ou em paralelo).
+
+    Args:
+        df: DataFrame validado, já com colunas renomeadas (ver _preparar).
+        manifesto: Manifesto do pipeline (opcional).
+        entradas: Impressões digitais por trimestre ('2025_1T'),
+            'versao_parser' e 'cadastro' (SHA-256 do cadastro).
+        pasta: Pasta dos estados parciais.
+        workers: Processos da agregação (1 = serial, groupby único).
+        comparar: Com workers > 1, roda também a versão serial e confere
+            se os resultados são idênticos.
+
+    Returns:
+        Estados parciais concatenados (ver calcular_parciais).
+    """
+    entradas = entradas or {}
+    parciais = []
+    pendentes = {}
+
+    periodos = df[CHAVES_PERIODO].drop_duplicates()
+    for ano, trimestre in periodos.itertuples(index=False):
+        chave = f"{ano}_{trimestre}T"
+        caminho = os.path.join(pasta, f"{chave}.parquet")
+        entradas_trimestre = {
+            "trimestre": entradas.get(chave),
+            "cadastro": entradas.get("cadastro"),
+            "versao_parser": entradas.get("versao_parser"),
+            "versao_agregacao": VERSAO_AGREGACAO,
+        }
+
+        if manifesto is not None and artefato_atualizado(manifesto, caminho, entradas_trimestre):
+            parcial = _ler_parciais(caminho)
+            if parcial is not None:
+                parciais.append(parcial)
+                continue
+
+        pendentes[(int(ano), str(trimestre))] = (caminho, entradas_trimestre)
+
+    if pendentes:
+        if len(pendentes) == len(periodos):
+            selecionados = df
+        else:
+            periodo = pd.MultiIndex.from_arrays([df["Ano"].astype(int), df["Trimestre"].astype(str)])
+            selecionados = df[periodo.isin(list(pendentes))]
+
+        if workers > 1:
+            novos = calcular_parciais_paralelo(selecionados, workers)
+            if comparar:
+                _comparar_parciais(calcular_parciais(selecionados), novos)
+        else:
+            novos = calcular_parciais(selecionados)
+
+        for (ano, trimestre), parcial in novos.groupby(CHAVES_PERIODO, sort=True):
+            caminho, entradas_trimestre = pendentes[(ano, trimestre)]
+            parcial = parcial.reset_index(drop=True)
+
+            if manifesto is not None and salvar_lote_parquet(parcial, caminho):
+                registrar_artefato(manifesto, caminho, entradas_trimestre)
+
+            parciais.append(parcial)
+
+    print(f"      Estados parciais: {len(periodos)} trimestres ({len(pendentes)} recalculados)")
+    return pd.concat(parciais, ignore_index=True)
+
 
 def agregar_e_exportar(
     df: pd.DataFrame,
-    output_dir: str = "data/output"
+    output_dir: str = "data/output",
+    formatos=(),
+    manifesto=None,
+    entradas=None,
+    workers: int = 1,
+    comparar: bool = False
 ) -> None:
     """
     Agrega despesas por RazãoSocial e UF.
-    
+
     Calcula:
     - Total de despesas por operadora/UF
     - Média de despesas por trimestre
     - Desvio padrão das despesas
-    
+
+    A agregação é feita por estados parciais por trimestre (ver
+    atualizar_parciais), então um trimestre novo não reprocessa os demais.
+    Trimestre e Ano são o primeiro período em que o grupo aparece.
+
     Args:
         df: DataFrame validado com despesas.
         output_dir: Diretório de saída para os arquivos.
-        
+        formatos: Saídas extras (src.exportacao.FORMATOS_EXTRAS).
+        manifesto: Manifesto do pipeline (opcional, habilita o reaproveitamento).
+        entradas: Impressões digitais das entradas (ver atualizar_parciais).
+        workers: Processos da agregação (1 = serial).
+        comparar: Confere a agregação paralela contra a serial.
+
     Output:
         - despesas_agregadas.csv
         - Teste_Joao_Vitor_Vale_da_Cruz.zip
+        - cubo/cubo_despesas*.csv (ver src.cubo)
     """
     if df.empty:
         print("      Aviso: DataFrame vazio, nada a agregar.")
@@ -33,51 +348,33 @@ def agregar_e_exportar(
     csv_path = output_path / "despesas_agregadas.csv"
     zip_path = output_path / "Teste_Joao_Vitor_Vale_da_Cruz.zip"
 
-    # Garante tipo numérico
-    df["ValorDespesas"] = pd.to_numeric(
-        df["ValorDespesas"],
-        errors="coerce"
-    )
-
-    # Renomear colunas para o padrão correto
-    df = df.rename(columns={
-        "registro_operadora": "RegistroANS",
-        "uf": "UF"
-    })
+    df = _preparar(df)
 
     # Agregação por RazaoSocial e UF conforme requisito 2.3
     # Calcula total, média e desvio padrão de despesas por operadora/UF
+    parciais = atualizar_parciais(
+        df,
+        manifesto,
+        entradas,
+        workers=workers,
+        comparar=comparar
+    )
+
     df_agregado = (
-        df
-        .groupby(["RazaoSocial", "UF"], as_index=False)
-        .agg(
-            CNPJ=("CNPJ", "first"),                          # Pega primeiro CNPJ
-            Trimestre=("Trimestre", "first"),                # Pega primeiro trimestre
-            Ano=("Ano", "first"),                            # Pega primeiro ano
-            ValorDespesas=("ValorDespesas", "sum"),          # SOMA de despesas
-            MediaTrimestral=("ValorDespesas", "mean"),       # Média por trimestre
-            DesvPadrao=("ValorDespesas", "std"),             # Desvio padrão
-            RegistroANS=("RegistroANS", "first"),            # Único por operadora
-            Modalidade=("modalidade", "first")               # Único por operadora
-        )
-        # Ordenar por valor total (maior para menor)
-        .sort_values(by="ValorDespesas", ascending=False)
+        combinar_parciais(parciais)
+        # Ordenar por valor total (maior para menor); empates na ordem das chaves
+        .sort_values(by="ValorDespesas", ascending=False, kind="stable")
     )
 
     # Reordenar colunas no padrão especificado
     colunas_finais = ["CNPJ", "RazaoSocial", "Trimestre", "Ano", "ValorDespesas", "MediaTrimestral", "DesvPadrao", "RegistroANS", "Modalidade", "UF"]
     df_agregado = df_agregado[colunas_finais]
 
-    # Salva CSV
-    df_agregado.to_csv(
-        csv_path,
-        index=False,
-        sep=";"
-    )
-
-    # Compacta em ZIP
-    with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zipf:
-        zipf.write(csv_path, arcname=csv_path.name)
+    # Salva CSV e ZIP na mesma passada (sem reler o CSV para compactar)
+    exportar_csv(df_agregado, str(csv_path), str(zip_path), formatos=formatos)
 
     print(f"CSV agregado salvo em: {csv_path}")
     print(f"Arquivo ZIP gerado em: {zip_path}")
+
+    # Cubo pré-agregado (UF x modalidade x trimestre x operadora) para o dashboard
+    exportar_cubo(df, output_dir, formatos=formatos)
@@ -0,0 +1,101 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+
+# Estatísticas de auditoria do consolidado, gravadas ao lado do CSV
+NOME_AUDITORIA = "consolidado_despesas_auditoria.json"
+
+
+def nova_auditoria() -> dict:
+    """Acumulador vazio para acumular_auditoria."""
+    return {
+        "registros": 0,
+        "valores_zerados": 0,
+        "valores_negativos": 0,
+        "cnpj_vazio": 0,
+        "por_trimestre": {},
+        "_periodos_operadora": {},
+    }
+
+
+def acumular_auditoria(auditoria: dict, bloco: pd.DataFrame) -> dict:
+    """
+    Soma as estatísticas de um bloco (lote, partição ou chunk) ao acumulador.
+
+    Cada coluna é percorrida uma vez, sem gerar cópias filtradas do bloco,
+    então os blocos podem chegar em streaming e em qualquer ordem.
+
+    Args:
+        auditoria: Acumulador criado por nova_auditoria.
+        bloco: DataFrame com REG_ANS, Ano, Trimestre e ValorDespesas
+            (CNPJ é opcional; ausente conta como vazio).
+
+    Returns:
+        O próprio acumulador.
+    """
+    valores = bloco["ValorDespesas"].to_numpy()
+
+    auditoria["registros"] += len(bloco)
+    auditoria["valores_zerados"] += int(np.count_nonzero(valores == 0))
+    auditoria["valores_negativos"] += int(np.count_nonzero(valores < 0))
+
+    if "CNPJ" in bloco:
+        auditoria["cnpj_vazio"] += int((bloco["CNPJ"] == "").sum())
+    else:
+        auditoria["cnpj_vazio"] += len(bloco)
+
+    contagens = bloco.groupby(["Ano", "Trimestre"], observed=True).size()
+    for (ano, trimestre), quantidade in contagens.items():
+        chave = (int(ano), str(trimestre))
+        auditoria["por_trimestre"][chave] = auditoria["por_trimestre"].get(chave, 0) + int(quantidade)
+
+    # Pares operadora/período distintos (poucos milhares por trimestre)
+    pares = bloco[["REG_ANS", "Ano", "Trimestre"]].drop_duplicates()
+    periodos_operadora = auditoria["_periodos_operadora"]
+    for reg_ans, ano, trimestre in pares.itertuples(index=False):
+        periodos_operadora.setdefault(str(reg_ans), set()).add((int(ano), str(trimestre)))
+
+    return auditoria
+
+
+def finalizar_auditoria(auditoria: dict) -> dict:
+    """
+    Converte o acumulador em um dicionário serializável em JSON.
+
+    Operadoras em múltiplos trimestres são contadas por período (Ano +
+    Trimestre), então o mesmo trimestre em anos diferentes conta duas vezes.
+    """
+    periodos_operadora = auditoria["_periodos_operadora"]
+
+    return {
+        "registros": auditoria["registros"],
+        "valores_zerados": auditoria["valores_zerados"],
+        "valores_negativos": auditoria["valores_negativos"],
+        "cnpj_vazio": auditoria["cnpj_vazio"],
+        "por_trimestre": [
+            {"ano": ano, "trimestre": trimestre, "registros": quantidade}
+            for (ano, trimestre), quantidade in sorted(auditoria["por_trimestre"].items())
+        ],
+        "operadoras": len(periodos_operadora),
+        "operadoras_multiplos_trimestres": sum(
+            1 for periodos in periodos_operadora.values() if len(periodos) > 1
+        ),
+    }
+
+
+def calcular_auditoria(blocos) -> dict:
+    """Estatísticas de auditoria de uma sequência de blocos, em uma passada."""
+    auditoria = nova_auditoria()
+    for bloco in blocos:
+        acumular_auditoria(auditoria, bloco)
+    return finalizar_auditoria(auditoria)
+
+
+def salvar_auditoria(estatisticas: dict, caminho: str) -> None:
+    """Grava as estatísticas em JSON de forma atômica."""
+    os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+    temporario = caminho + ".tmp"
+    with open(temporario, "w", encoding="utf-8") as f:
+        json.dump(estatisticas, f, indent=2, ensure_ascii=False)
+    os.replace(temporario, caminho)
@@ -0,0 +1,132 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+
+from src.manifest import descrever_arquivo
+
+# Cadastro de operadoras já tratado, reaproveitado enquanto o CSV de
+# origem não mudar (tamanho/mtime e, se preciso, SHA-256)
+CAMINHO_CACHE_CADASTRO = "data/cache/cadastro_operadoras.parquet"
+# Incrementar sempre que o tratamento do cadastro mudar
+VERSAO_CADASTRO = 1
+
+CHAVE_CADASTRO = "registro_operadora"
+
+
+def ler_cadastro_csv(caminho: str) -> pd.DataFrame:
+    """
+    Lê e trata o CSV de cadastro de operadoras da ANS.
+
+    Colunas em minúsculas, aspas removidas de cnpj, registro_operadora,
+    modalidade e uf, e uma linha por registro_operadora (a primeira).
+    """
+    df_cadastro = pd.read_csv(
+        caminho,
+        sep=";",
+        dtype=str,
+        encoding="latin1"
+    )
+
+    df_cadastro.columns = [c.lower() for c in df_cadastro.columns]
+
+    # Limpar aspas dos valores (formato CSV do cadastro)
+    for col in ["cnpj", "registro_operadora", "modalidade", "uf"]:
+        if col in df_cadastro.columns:
+            df_cadastro[col] = df_cadastro[col].str.strip('"')
+
+    # Drop duplicates apenas se a coluna existir
+    if CHAVE_CADASTRO in df_cadastro.columns:
+        df_cadastro = df_cadastro.drop_duplicates(
+            subset=CHAVE_CADASTRO,
+            keep="first"
+        )
+
+    return df_cadastro.reset_index(drop=True)
+
+
+def _caminho_metadados(caminho_cache: str) -> str:
+    return os.path.splitext(caminho_cache)[0] + ".json"
+
+
+def _ler_metadados(caminho_cache: str) -> dict:
+    try:
+        with open(_caminho_metadados(caminho_cache), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _salvar_metadados(caminho_cache: str, origem: dict) -> None:
+    caminho = _caminho_metadados(caminho_cache)
+    temporario = caminho + ".tmp"
+    with open(temporario, "w", encoding="utf-8") as f:
+        json.dump({"versao": VERSAO_CADASTRO, "origem": origem}, f, indent=2)
+    os.replace(temporario, caminho)
+
+
+def carregar_cadastro(caminho_csv: str, caminho_cache: str = CAMINHO_CACHE_CADASTRO) -> pd.DataFrame:
+    """
+    Retorna o cadastro tratado, usando o cache Parquet quando válido.
+
+    O cache é invalidado quando o CSV de origem muda de conteúdo (o hash
+    só é recalculado se tamanho ou mtime mudarem) ou quando VERSAO_CADASTRO
+    muda. Também pode ser usado pela API para consultar o cadastro.
+
+    Args:
+        caminho_csv: CSV de cadastro baixado da ANS.
+        caminho_cache: Parquet com o cadastro tratado.
+
+    Returns:
+        DataFrame do cadastro, uma linha por registro_operadora.
+    """
+    metadados = _ler_metadados(caminho_cache)
+    origem = descrever_arquivo(caminho_csv, metadados.get("origem"))
+
+    if (
+        metadados.get("versao") == VERSAO_CADASTRO
+        and metadados.get("origem", {}).get("sha256") == origem["sha256"]
+        and os.path.exists(caminho_cache)
+    ):
+        try:
+            df_cadastro = pd.read_parquet(caminho_cache)
+        except (ImportError, OSError, ValueError) as e:
+            print(f"      Aviso: cache do cadastro ilegível, relendo CSV: {e}")
+        else:
+            if metadados["origem"] != origem:
+                # Mesmo conteúdo com novo mtime: só atualiza os metadados
+                _salvar_metadados(caminho_cache, origem)
+            return df_cadastro
+
+    df_cadastro = ler_cadastro_csv(caminho_csv)
+
+    os.makedirs(os.path.dirname(caminho_cache) or ".", exist_ok=True)
+    temporario = f"{caminho_cache}.{os.getpid()}.tmp"
+    try:
+        df_cadastro.to_parquet(temporario, index=False)
+    except ImportError:
+        return df_cadastro
+
+    os.replace(temporario, caminho_cache)
+    _salvar_metadados(caminho_cache, origem)
+    return df_cadastro
+
+
+def indexar_registros(df_cadastro: pd.DataFrame, registros) -> np.ndarray:
+    """
+    Posição no cadastro de cada registro ANS (-1 se não cadastrado).
+
+    Com `registros` categórico, só as categorias (uma por operadora) são
+    procuradas no índice; as linhas são resolvidas pelos códigos inteiros.
+    """
+    indice = pd.Index(df_cadastro[CHAVE_CADASTRO])
+    registros = pd.Series(registros)
+
+    if not isinstance(registros.dtype, pd.CategoricalDtype):
+        registros = registros.astype("category")
+
+    posicoes = indice.get_indexer(registros.cat.categories)
+    codigos = registros.cat.codes.to_numpy()
+
+    # Código -1 (nulo) nunca encontra cadastro
+    return np.where(codigos >= 0, posicoes[codigos], -1)
@@ -1,95 +1,219 @@
 import csv
-import zipfile
 import os
+import numpy as np
 import pandas as pd
 
+from src.auditoria import NOME_AUDITORIA, calcular_auditoria, salvar_auditoria
+from src.exportacao import exportar_csv
+from src.lotes import COLUNAS_CATEGORICAS, concatenar_lotes, ler_lote_parquet, salvar_lote_parquet
+from src.manifest import artefato_atualizado, registrar_artefato
 
-def consolidar_dados(registros, caminho_saida="data/output"):
+# Dataset consolidado particionado por Ano/Trimestre (um Parquet por
+# trimestre, dentro de caminho_saida). O CSV/ZIP é exportado a partir dele.
+PASTA_PARTICOES = "consolidado"
+
+# Colunas do CSV consolidado (e do DataFrame passado às etapas seguintes)
+COLUNAS_CONSOLIDADO = ["CNPJ", "RazaoSocial", "REG_ANS", "Trimestre", "Ano", "ValorDespesas"]
+
+
+def _coluna_vazia(n: int) -> pd.Categorical:
+    # Coluna de texto vazio com 1 byte por linha
+    return pd.Categorical.from_codes(np.zeros(n, dtype=np.int8), categories=[""])
+
+
+def caminho_particao(ano, trimestre, caminho_saida="data/output") -> str:
+    """Caminho do Parquet da partição de um trimestre (ex: .../2025_1T.parquet)."""
+    return os.path.join(caminho_saida, PASTA_PARTICOES, f"{ano}_{trimestre}T.parquet")
+
+
+def _ordenar_particao(particao: pd.DataFrame) -> pd.DataFrame:
     """
-    Consolida dados de todos os trimestres em um único CSV.
-    
+    Ordena uma partição por REG_ANS (ordenação estável) e enxuga as categorias.
+
+    Como as partições são gravadas já ordenadas, concatená-las em ordem
+    cronológica equivale a ordenar o lote inteiro por Ano, Trimestre e REG_ANS.
+    """
+    particao = particao.sort_values("REG_ANS", kind="stable").reset_index(drop=True)
+
+    for coluna in COLUNAS_CATEGORICAS:
+        particao[coluna] = particao[coluna].cat.remove_unused_categories()
+
+    return particao
+
+
+def atualizar_particoes(lote, caminho_saida="data/output", manifesto=None, entradas=None) -> list:
+    """
+    Grava as partições Ano/Trimestre do lote que estiverem desatualizadas
+    e lê as demais do disco.
+
+    Com `manifesto`, uma partição só é regravada se a impressão digital do
+    seu trimestre (ou a versão do parser) mudou; sem ele, não há como saber
+    se o Parquet existente corresponde ao lote, então todas as partições do
+    lote são regravadas. Partições atualizadas são lidas do Parquet em vez
+    de reordenadas a partir do lote. Partições de trimestres fora do lote
+    são mantidas.
+
+    Args:
+        lote: Lote colunar (src.lotes) com um ou mais trimestres.
+        caminho_saida: Pasta de saída do consolidado.
+        manifesto: Manifesto do pipeline (opcional).
+        entradas: Impressões digitais por trimestre ('2025_1T') e 'versao_parser'.
+
+    Returns:
+        Lista de tuplas (ano, trimestre, particao) em ordem cronológica.
+    """
+    entradas = entradas or {}
+    particoes = []
+    regravadas = 0
+
+    for (ano, trimestre), registros in lote.groupby(["Ano", "Trimestre"], observed=True, sort=True):
+        caminho = caminho_particao(ano, trimestre, caminho_saida)
+        entradas_particao = {
+            "trimestre": entradas.get(f"{ano}_{trimestre}T"),
+            "versao_parser": entradas.get("versao_parser"),
+        }
+
+        atualizada = manifesto is not None and artefato_atualizado(manifesto, caminho, entradas_particao)
+
+        particao = ler_lote_parquet(caminho) if atualizada else None
+
+        if particao is None:
+            particao = _ordenar_particao(registros)
+            if salvar_lote_parquet(particao, caminho):
+                regravadas += 1
+                if manifesto is not None:
+                    registrar_artefato(manifesto, caminho, entradas_particao)
+
+        particoes.append((ano, trimestre, particao))
+
+    print(f"  Partições: {len(particoes)} ({regravadas} regravadas)")
+    return particoes
+
+
+def preparar_consolidado(lote, caminho_saida="data/output", manifesto=None, entradas=None):
+    """
+    Atualiza as partições e monta o consolidado tipado, já ordenado.
+
+    É o mesmo conteúdo do CSV exportado, mas com os tipos do lote
+    (categóricos + float64), pronto para ser passado direto às etapas
+    seguintes sem reler o arquivo.
+
+    Args:
+        lote: Lote colunar (src.lotes) com os registros de todos os trimestres.
+        caminho_saida: Pasta de saída do consolidado.
+        manifesto: Manifesto do pipeline (opcional).
+        entradas: Impressões digitais por trimestre e 'versao_parser'.
+
+    Returns:
+        DataFrame com COLUNAS_CONSOLIDADO, ou None se não houver registros.
+    """
+    os.makedirs(caminho_saida, exist_ok=True)
+
+    if lote is None or lote.empty:
+        print("Aviso: Nenhum registro para consolidar")
+        return None
+
+    # Só as partições com trimestre novo ou alterado são regravadas;
+    # as demais vêm do disco
+    particoes = atualizar_particoes(lote, caminho_saida, manifesto, entradas)
+
+    # Partições já ordenadas por Ano, Trimestre e REG_ANS
+    # (tipos garantidos pelo lote: categóricos + float64)
+    df = concatenar_lotes(particao for _, _, particao in particoes)
+
+    # Não disponíveis na fonte (API ANS)
+    df["CNPJ"] = _coluna_vazia(len(df))
+    df["RazaoSocial"] = _coluna_vazia(len(df))
+
+    return df[COLUNAS_CONSOLIDADO]
+
+
+def exportar_consolidado(
+    df,
+    caminho_saida="data/output",
+    manifesto=None,
+    entradas=None,
+    formatos=()
+):
+    """
+    Exporta o consolidado (CSV + ZIP) e as estatísticas de auditoria.
+
     Tratamento de inconsistências:
     - CNPJs duplicados: Identificados por RegistroANS + Trimestre
     - Valores zerados/negativos: Mantidos com marcação de suspeita
     - Estrutura de trimestres: Garantida pela origem (data/extracted/YYYY_QT/)
-    """
-    os.makedirs(caminho_saida, exist_ok=True)
 
-    # ZIP final
+    Com `manifesto`, a exportação só é refeita se o ZIP não foi gerado a
+    partir das mesmas `entradas` (impressão digital de cada trimestre).
+
+    Args:
+        df: Consolidado montado por preparar_consolidado.
+        caminho_saida: Pasta de saída do consolidado.
+        manifesto: Manifesto do pipeline (opcional).
+        entradas: Impressões digitais por trimestre e 'versao_parser'.
+        formatos: Saídas extras (src.exportacao.FORMATOS_EXTRAS).
+
+    Returns:
+        Caminho do ZIP.
+    """
     zip_path = os.path.join(caminho_saida, "consolidado_despesas.zip")
-    
+
     # Verificar se já foi consolidado
-    if os.path.exists(zip_path):
+    if manifesto is None:
+        ja_consolidado = os.path.exists(zip_path)
+    else:
+        ja_consolidado = artefato_atualizado(manifesto, zip_path, entradas)
+
+    if ja_consolidado:
         print(f"Consolidado já existe, pulando: {zip_path}")
         return zip_path
 
-    if not registros:
-        print("Aviso: Nenhum registro para consolidar")
-        return None
+    # Estatísticas de auditoria em uma passada:
+    # - Valores zerados/negativos: mantidos, marcados como suspeitos
+    # - CNPJs duplicados: REG_ANS presente em mais de um trimestre
+    #   (mesmo sem CNPJ real, REG_ANS identifica a operadora)
+    auditoria = calcular_auditoria([df])
+    salvar_auditoria(auditoria, os.path.join(caminho_saida, NOME_AUDITORIA))
 
-    # Converter para DataFrame
-    df = pd.DataFrame(registros)
+    print(f"✓ Consolidado: {auditoria['registros']} registros de despesas")
+    for periodo in auditoria["por_trimestre"]:
+        print(f"  - {periodo['trimestre']}T {periodo['ano']}: {periodo['registros']} registros")
+    
+    print(f"\n  INCONSISTÊNCIAS DETECTADAS:")
+    print(f"  - Valores zerados: {auditoria['valores_zerados']}")
+    print(f"  - Valores negativos: {auditoria['valores_negativos']}")
+    print(f"  - Operadoras em múltiplos trimestres: {auditoria['operadoras_multiplos_trimestres']}")
+    print(f"  - CNPJ vazio: {auditoria['cnpj_vazio']} (100% - não disponível na fonte)")
 
-    # Garantir tipos corretos
-    df["Ano"] = df["Ano"].astype(int)
-    df["Trimestre"] = df["Trimestre"].astype(str)
-    df["ValorDespesas"] = df["ValorDespesas"].astype(float)
+    # CSV final, ZIP (para arquivo) e extras gravados na mesma passada
+    csv_final = os.path.join(caminho_saida, "consolidado_despesas.csv")
+    exportar_csv(df, csv_final, zip_path, formatos=formatos)
 
-    # Marcar registros suspeitos (valores <= 0)
-    df["Suspeito"] = df["ValorDespesas"] <= 0
+    print(f"\n ZIP gerado: {zip_path}")
 
-    # Detectar CNPJs duplicados por REG_ANS
-    # (mesmo sem CNPJ real, REG_ANS identifica a operadora)
-    operadoras_multiplas = df.groupby("REG_ANS")["Trimestre"].nunique()
-    operadoras_com_multiplos = operadoras_multiplas[operadoras_multiplas > 1].index
-    
-    df["CNPJDuplicado"] = df["REG_ANS"].isin(operadoras_com_multiplos)
+    if manifesto is not None:
+        registrar_artefato(manifesto, zip_path, entradas)
 
-    # Ordenar dados
-    df = df.sort_values(["Ano", "Trimestre", "REG_ANS"])
+    return zip_path
 
-    # CSV temporário com coluna de auditoria
-    csv_temp = os.path.join(caminho_saida, "_consolidado_temp.csv")
 
-    # Colunas do CSV final (sem colunas de auditoria)
-    colunas_saida = ["CNPJ", "RazaoSocial", "REG_ANS", "Trimestre", "Ano", "ValorDespesas"]
+def consolidar_dados(lote, caminho_saida="data/output", manifesto=None, entradas=None):
+    """
+    Consolida dados de todos os trimestres em um único CSV.
     
-    df[colunas_saida].to_csv(
-        csv_temp,
-        sep=";",
-        encoding="utf-8",
-        index=False
-    )
-
-    # Estatísticas para output
-    zerados = len(df[df["ValorDespesas"] == 0])
-    negativos = len(df[df["ValorDespesas"] < 0])
-    operadoras_multiplas_count = len(operadoras_com_multiplos)
-
-    print(f"✓ Consolidado: {len(df)} registros de despesas")
-    print(f"  - 1T 2025: {len(df[(df['Ano'] == 2025) & (df['Trimestre'] == '1')])} registros")
-    print(f"  - 2T 2025: {len(df[(df['Ano'] == 2025) & (df['Trimestre'] == '2')])} registros")
-    print(f"  - 3T 2025: {len(df[(df['Ano'] == 2025) & (df['Trimestre'] == '3')])} registros")
+    Os registros são mantidos em um dataset particionado por Ano/Trimestre
+    (ver atualizar_particoes); o CSV/ZIP é uma exportação derivada das
+    partições dos trimestres do lote.
     
-    print(f"\n  INCONSISTÊNCIAS DETECTADAS:")
-    print(f"  - Valores zerados: {zerados}")
-    print(f"  - Valores negativos: {negativos}")
-    print(f"  - Operadoras em múltiplos trimestres: {operadoras_multiplas_count}")
-    print(f"  - CNPJ vazio: {len(df[df['CNPJ'] == ''])} (100% - não disponível na fonte)")
-
-    # Caminho final do CSV (sem compressão)
-    csv_final = os.path.join(caminho_saida, "consolidado_despesas.csv")
+    Args:
+        lote: Lote colunar (src.lotes) com os registros de todos os trimestres.
     
-    # Mover CSV temporário para final
-    if os.path.exists(csv_final):
-        os.remove(csv_final)
-    os.rename(csv_temp, csv_final)
-
-    # ZIP final (para arquivo)
-    zip_path = os.path.join(caminho_saida, "consolidado_despesas.zip")
-    with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zipf:
-        zipf.write(csv_final, arcname="consolidado_despesas.csv")
+    Returns:
+        Caminho do ZIP consolidado, ou None se não houver registros.
+    """
+    df = preparar_consolidado(lote, caminho_saida, manifesto, entradas)
 
-    print(f"\n ZIP gerado: {zip_path}")
+    if df is None:
+        return None
 
-    return zip_path
+    return exportar_consolidado(df, caminho_saida, manifesto, entradas)
@@ -0,0 +1,131 @@
+import os
+import pandas as pd
+
+from src.exportacao import exportar_csv
+
+# Cubo de despesas validadas: grão operadora x trimestre (com UF e
+# modalidade do cadastro), mais recortes pré-agregados a partir dele.
+# Cada tabela tem poucos milhares de linhas e pode ser carregada no banco.
+PASTA_CUBO = "cubo"
+
+DIMENSOES_OPERADORA = ["RegistroANS", "RazaoSocial", "UF", "Modalidade"]
+DIMENSOES_PERIODO = ["Ano", "Trimestre"]
+
+# Recortes do cubo: nome da tabela -> dimensões
+RECORTES_CUBO = {
+    "uf": ["UF"],
+    "modalidade": ["Modalidade"],
+    "periodo": DIMENSOES_PERIODO,
+    "uf_periodo": ["UF"] + DIMENSOES_PERIODO,
+    "uf_modalidade": ["UF", "Modalidade"],
+}
+
+
+def cubo_base(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Totais por operadora e trimestre.
+
+    Usa a mesma população da agregação por RazaoSocial/UF (linhas com
+    RazaoSocial e UF preenchidas), então os recortes por UF batem com a
+    soma de despesas_agregadas. Modalidade nula vira um grupo próprio.
+
+    Args:
+        df: DataFrame validado, com colunas RegistroANS, RazaoSocial, UF,
+            Modalidade, Ano, Trimestre e ValorDespesas.
+
+    Returns:
+        DataFrame com as dimensões, ValorDespesas (soma) e Registros.
+    """
+    df = df[df["RazaoSocial"].notna() & df["UF"].notna()]
+
+    base = (
+        df
+        .groupby(DIMENSOES_OPERADORA + DIMENSOES_PERIODO, observed=True, dropna=False, sort=True)
+        .agg(
+            ValorDespesas=("ValorDespesas", "sum"),
+            Registros=("ValorDespesas", "count")
+        )
+        .reset_index()
+    )
+
+    base["Ano"] = base["Ano"].astype(int)
+    base["Trimestre"] = base["Trimestre"].astype(str)
+    return base
+
+
+def recortar_cubo(base: pd.DataFrame, dimensoes: list) -> pd.DataFrame:
+    """
+    Soma o cubo base nas `dimensoes`, contando operadoras (RegistroANS) e
+    razões sociais distintas. No recorte por UF, RazoesSociais é o número
+    de linhas de despesas_agregadas (agrupada por RazaoSocial/UF) na UF.
+    """
+    return (
+        base
+        .groupby(dimensoes, dropna=False, sort=True)
+        .agg(
+            ValorDespesas=("ValorDespesas", "sum"),
+            Registros=("Registros", "sum"),
+            Operadoras=("RegistroANS", "nunique"),
+            RazoesSociais=("RazaoSocial", "nunique")
+        )
+        .reset_index()
+    )
+
+
+def resumir_operadoras(base: pd.DataFrame) -> pd.DataFrame:
+    """
+    Uma linha por operadora: totais e os valores do primeiro e do último
+    trimestre em que ela aparece (base para o crescimento percentual).
+    """
+    base = base.sort_values(DIMENSOES_PERIODO, kind="stable")
+    chaves = ["RegistroANS", "RazaoSocial", "UF", "Modalidade"]
+    grupos = base.groupby(chaves, dropna=False, sort=True)
+
+    resumo = grupos.agg(
+        ValorDespesas=("ValorDespesas", "sum"),
+        Registros=("Registros", "sum"),
+        Trimestres=("ValorDespesas", "size"),
+        PrimeiroAno=("Ano", "first"),
+        PrimeiroTrimestre=("Trimestre", "first"),
+        PrimeiroValor=("ValorDespesas", "first"),
+        UltimoAno=("Ano", "last"),
+        UltimoTrimestre=("Trimestre", "last"),
+        UltimoValor=("ValorDespesas", "last")
+    ).reset_index()
+
+    return resumo
+
+
+def exportar_cubo(df: pd.DataFrame, output_dir: str = "data/output", formatos=()) -> dict:
+    """
+    Gera e grava as tabelas do cubo em `<output_dir>/cubo/`.
+
+    Tabelas: cubo_despesas (operadora x trimestre), cubo_despesas_operadora
+    (primeiro/último trimestre) e um cubo_despesas_<recorte> para cada
+    item de RECORTES_CUBO.
+
+    Args:
+        df: DataFrame validado (ver cubo_base).
+        output_dir: Diretório de saída.
+        formatos: Saídas extras (src.exportacao.FORMATOS_EXTRAS).
+
+    Returns:
+        Dicionário {nome da tabela: DataFrame}.
+    """
+    base = cubo_base(df)
+
+    tabelas = {
+        "cubo_despesas": base,
+        "cubo_despesas_operadora": resumir_operadoras(base),
+        **{
+            f"cubo_despesas_{nome}": recortar_cubo(base, dimensoes)
+            for nome, dimensoes in RECORTES_CUBO.items()
+        },
+    }
+
+    pasta = os.path.join(output_dir, PASTA_CUBO)
+    for nome, tabela in tabelas.items():
+        exportar_csv(tabela, os.path.join(pasta, f"{nome}.csv"), formatos=formatos)
+
+    print(f"Cubo de despesas salvo em: {pasta} ({len(tabelas)} tabelas, {len(base)} linhas no grão)")
+    return tabelas
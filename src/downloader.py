@@ -1,8 +1,16 @@
+import json
 import os
 import re
+import time
 import requests
-from bs4 import BeautifulSoup
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from html.parser import HTMLParser
+from requests.adapters import HTTPAdapter
 from urllib.parse import urljoin
+from urllib3.util.retry import Retry
+
+from src.manifest import carregar_manifesto, registrar_fonte, salvar_manifesto
 
 BASE_URL = "https://dadosabertos.ans.gov.br/FTP/PDA/demonstracoes_contabeis/"
 URL_CADASTRO_OPERADORAS =  "https://dadosabertos.ans.gov.br/FTP/PDA/operadoras_de_plano_de_saude_ativas/Relatorio_cadop.csv"
@@ -11,65 +19,215 @@ URL_CADASTRO_OPERADORAS =  "https://dadosabertos.ans.gov.br/FTP/PDA/operadoras_d
 RAW_DATA_DIR = "data/raw"
 PASTA_SAIDA = "data/output"
 
+# Downloads paralelos compartilham uma única sessão (pool de conexões)
+MAX_DOWNLOADS_PARALELOS = 4
+CHUNK_DOWNLOAD = 1024 * 1024  # 1 MB
+TENTATIVAS_DOWNLOAD = 5
+
+# Cache das listagens de diretório (ETag/Last-Modified por URL)
+CACHE_DIR = "data/cache"
+CACHE_LISTAGENS = os.path.join(CACHE_DIR, "listagens.json")
+# Apenas os anos mais recentes mudam; os demais são servidos do cache
+ANOS_REVALIDADOS = 2
+
+# O cadastro de operadoras muda semanalmente; é revalidado na fonte
+# (GET condicional) no máximo uma vez a cada IDADE_MAXIMA_CADASTRO segundos
+NOME_CADASTRO = "operadoras_ativas.csv"
+IDADE_MAXIMA_CADASTRO = 24 * 60 * 60
+
 
 def criar_diretorio(path: str):
     if not os.path.exists(path):
         os.makedirs(path)
 
 
-def listar_diretorios(url: str):
+def criar_sessao(pool_size: int = MAX_DOWNLOADS_PARALELOS) -> requests.Session:
     """
-    Retorna uma lista de nomes de diretórios disponíveis em uma URL.
+    Cria uma sessão HTTP com pool de conexões e retentativas automáticas.
+    
+    Args:
+        pool_size: Número máximo de conexões simultâneas por host.
+        
+    Returns:
+        Sessão configurada para ser compartilhada entre threads.
+    """
+    retry = Retry(
+        total=3,
+        backoff_factor=1,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=["HEAD", "GET"]
+    )
+    adapter = HTTPAdapter(
+        pool_connections=pool_size,
+        pool_maxsize=pool_size,
+        max_retries=retry
+    )
+
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+class _ColetorLinks(HTMLParser):
+    """Coleta apenas o atributo href das tags <a> de uma listagem."""
+
+    def __init__(self):
+        super().__init__()
+        self.links = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag != "a":
+            return
+        for nome, valor in attrs:
+            if nome == "href" and valor:
+                self.links.append(valor)
+
+
+def _extrair_links(html: str) -> list:
+    coletor = _ColetorLinks()
+    coletor.feed(html)
+    coletor.close()
+    return coletor.links
+
+
+def carregar_cache_listagens(caminho: str = CACHE_LISTAGENS) -> dict:
+    """Carrega o cache de listagens ({url: {etag, last_modified, links}})."""
+    if not os.path.exists(caminho):
+        return {}
+    try:
+        with open(caminho, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def salvar_cache_listagens(cache: dict, caminho: str = CACHE_LISTAGENS) -> None:
+    """Grava o cache de listagens de forma atômica."""
+    criar_diretorio(os.path.dirname(caminho))
+    temporario = caminho + ".tmp"
+    with open(temporario, "w", encoding="utf-8") as f:
+        json.dump(cache, f)
+    os.replace(temporario, caminho)
+
+
+def listar_links(
+    url: str,
+    session: requests.Session,
+    cache: dict,
+    revalidar: bool = True
+) -> list:
+    """
+    Retorna os hrefs de uma listagem de diretório, usando o cache.
+    
+    Com `revalidar=True` faz um GET condicional (If-None-Match /
+    If-Modified-Since); um 304 reaproveita os links do cache. Com
+    `revalidar=False` e a URL já em cache, nenhuma requisição é feita.
     
     Args:
         url: URL do diretório FTP/HTTP a listar.
+        session: Sessão HTTP compartilhada.
+        cache: Dicionário de cache (atualizado in-place).
+        revalidar: Se deve consultar o servidor mesmo havendo cache.
         
     Returns:
-        Lista de nomes de diretórios encontrados.
+        Lista de hrefs encontrados.
         
     Raises:
         requests.RequestException: Se houver falha na conexão.
     """
+    entrada = cache.get(url)
+    if entrada and not revalidar:
+        return entrada["links"]
+
+    headers = {}
+    if entrada:
+        if entrada.get("etag"):
+            headers["If-None-Match"] = entrada["etag"]
+        if entrada.get("last_modified"):
+            headers["If-Modified-Since"] = entrada["last_modified"]
+
+    response = session.get(url, headers=headers, timeout=30)
+
+    if response.status_code == 304 and entrada:
+        return entrada["links"]
+
+    response.raise_for_status()
+
+    links = _extrair_links(response.text)
+    cache[url] = {
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+        "links": links
+    }
+    return links
+
+
+def listar_diretorios(url: str, session: requests.Session = None, cache: dict = None):
+    """
+    Retorna uma lista de nomes de diretórios disponíveis em uma URL.
+    
+    Args:
+        url: URL do diretório FTP/HTTP a listar.
+        session: Sessão HTTP compartilhada (opcional; sem ela, uma sessão
+            própria é criada e fechada ao final).
+        cache: Cache de listagens (opcional).
+        
+    Returns:
+        Lista de nomes de diretórios encontrados.
+    """
     try:
-        response = requests.get(url, timeout=30)
-        response.raise_for_status()
+        with nullcontext(session) if session is not None else criar_sessao(1) as sessao:
+            links = listar_links(url, sessao, {} if cache is None else cache)
     except requests.RequestException as e:
         print(f"Erro ao acessar {url}: {e}")
         return []
 
-    soup = BeautifulSoup(response.text, "html.parser")
-
-    diretorios = []
-    for link in soup.find_all("a"):
-        href = link.get("href")
-        if href and href.endswith("/") and href not in ["../"]:
-            diretorios.append(href.strip("/"))
+    return [
+        href.strip("/")
+        for href in links
+        if href.endswith("/") and href not in ["../"]
+    ]
 
-    return diretorios
 
 def obter_ultimos_trimestres(qtd: int = 3):
     """
     Retorna uma lista de tuplas:
     (ano, trimestre, nome_arquivo)
     Ex: (2025, 1, '1T2025.zip')
+    
+    As listagens ficam em cache (data/cache/listagens.json). Apenas os
+    `ANOS_REVALIDADOS` anos mais recentes são revalidados com GET
+    condicional; os demais são crawleados em paralelo só se ainda não
+    estiverem no cache.
     """
-    anos = listar_diretorios(BASE_URL)
+    cache = carregar_cache_listagens()
     encontrados = []
 
-    for ano in anos:
-        if not ano.isdigit() or len(ano) != 4:
-            continue
+    with criar_sessao() as session:
+        anos = sorted(
+            (ano for ano in listar_diretorios(BASE_URL, session, cache)
+             if ano.isdigit() and len(ano) == 4),
+            reverse=True
+        )
+        recentes = set(anos[:ANOS_REVALIDADOS])
 
-        ano_url = urljoin(BASE_URL, f"{ano}/")
-        response = requests.get(ano_url)
-        response.raise_for_status()
+        def listar_ano(ano):
+            ano_url = urljoin(BASE_URL, f"{ano}/")
+            try:
+                return listar_links(ano_url, session, cache, revalidar=ano in recentes)
+            except requests.RequestException as e:
+                print(f"Erro ao acessar {ano_url}: {e}")
+                return cache.get(ano_url, {}).get("links", [])
 
-        soup = BeautifulSoup(response.text, "html.parser")
+        with ThreadPoolExecutor(max_workers=MAX_DOWNLOADS_PARALELOS) as executor:
+            listagens = list(executor.map(listar_ano, anos))
 
-        for link in soup.find_all("a"):
-            href = link.get("href")
+    salvar_cache_listagens(cache)
 
-            if not href or not href.lower().endswith(".zip"):
+    for links in listagens:
+        for href in links:
+            if not href.lower().endswith(".zip"):
                 continue
 
             # Padrão esperado: 1T2025.zip
@@ -88,14 +246,171 @@ def obter_ultimos_trimestres(qtd: int = 3):
 
     return encontrados[:qtd]
 
-def baixar_zip(ano: int, trimestre: int, nome_arquivo: str) -> bool:
+
+def _validadores(headers) -> dict:
+    return {
+        "etag": headers.get("ETag"),
+        "last_modified": headers.get("Last-Modified")
+    }
+
+
+def _ler_validadores_parcial(caminho_parcial: str) -> dict:
+    try:
+        with open(caminho_parcial + ".json", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _descartar_parcial(caminho_parcial: str) -> None:
+    for caminho in (caminho_parcial, caminho_parcial + ".json"):
+        if os.path.exists(caminho):
+            os.remove(caminho)
+
+
+def _inicio_content_range(valor) -> int:
+    """Primeiro byte de um cabeçalho `Content-Range: bytes inicio-fim/total` (None se inválido)."""
+    match = re.match(r"bytes (\d+)-\d+/(\d+|\*)", valor or "")
+    return int(match.group(1)) if match else None
+
+
+def _tamanho_remoto(session: requests.Session, url: str) -> int:
+    r = session.head(url, timeout=30, allow_redirects=True)
+    r.raise_for_status()
+    tamanho = r.headers.get("Content-Length")
+    return int(tamanho) if tamanho is not None else None
+
+
+def _baixar_com_retomada(session: requests.Session, url: str, caminho: str) -> dict:
+    """
+    Baixa `url` para `caminho` passando por um arquivo temporário `.part`.
+    
+    Se o `.part` já existir (download interrompido), retoma a partir do
+    último byte gravado com os cabeçalhos Range e If-Range. Os validadores
+    (ETag/Last-Modified) da versão sendo baixada ficam em `.part.json`;
+    se o arquivo mudou na fonte, o servidor responde 200 e o download
+    recomeça do zero em vez de emendar bytes de versões diferentes. O
+    arquivo final só aparece após o download completo, via rename atômico.
+    
+    Returns:
+        Validadores HTTP (ETag/Last-Modified) da resposta.
+    
+    Raises:
+        requests.RequestException: Se todas as tentativas falharem.
+    """
+    caminho_parcial = caminho + ".part"
+    ultimo_erro = None
+
+    for _ in range(TENTATIVAS_DOWNLOAD):
+        validadores = _ler_validadores_parcial(caminho_parcial)
+        condicao = validadores.get("etag") or validadores.get("last_modified")
+
+        # Sem validadores não há como saber se o .part é da versão atual
+        if os.path.exists(caminho_parcial) and not condicao:
+            _descartar_parcial(caminho_parcial)
+
+        inicio = os.path.getsize(caminho_parcial) if os.path.exists(caminho_parcial) else 0
+        headers = {"Range": f"bytes={inicio}-", "If-Range": condicao} if inicio else {}
+
+        try:
+            with session.get(url, headers=headers, stream=True, timeout=(10, 120)) as r:
+                if r.status_code == 416:
+                    # Range fora do arquivo: o .part só está completo se
+                    # tiver exatamente o tamanho atual na fonte
+                    if _tamanho_remoto(session, url) == inicio:
+                        break
+                    _descartar_parcial(caminho_parcial)
+                    raise requests.RequestException(
+                        f"Arquivo parcial com tamanho inválido ({inicio} bytes)"
+                    )
+
+                r.raise_for_status()
+
+                if r.status_code == 206 and _inicio_content_range(r.headers.get("Content-Range")) != inicio:
+                    _descartar_parcial(caminho_parcial)
+                    raise requests.RequestException(
+                        f"Content-Range inesperado: {r.headers.get('Content-Range')}"
+                    )
+
+                # 206 = servidor aceitou retomar a mesma versão; 200 = recomeça do zero
+                modo = "ab" if r.status_code == 206 else "wb"
+                if modo == "wb":
+                    validadores = _validadores(r.headers)
+                    with open(caminho_parcial + ".json", "w", encoding="utf-8") as f:
+                        json.dump(validadores, f)
+
+                with open(caminho_parcial, modo) as f:
+                    for chunk in r.iter_content(chunk_size=CHUNK_DOWNLOAD):
+                        f.write(chunk)
+
+                esperado = r.headers.get("Content-Length")
+                gravado = os.path.getsize(caminho_parcial) - (inicio if modo == "ab" else 0)
+                if esperado is not None and gravado != int(esperado):
+                    raise requests.RequestException(
+                        f"Download incompleto ({gravado}/{esperado} bytes)"
+                    )
+            break
+        except requests.RequestException as e:
+            ultimo_erro = e
+    else:
+        raise ultimo_erro
+
+    os.replace(caminho_parcial, caminho)
+    _descartar_parcial(caminho_parcial)
+    return {campo: validadores.get(campo) for campo in ("etag", "last_modified")}
+
+
+def _fonte_alterada(session: requests.Session, url: str, registro: dict) -> bool:
+    """
+    Compara os validadores HTTP atuais de `url` com os do manifesto.
+    
+    Sem validadores registrados (arquivo anterior ao manifesto) ou sem
+    acesso à rede, assume que a fonte não mudou.
+    """
+    try:
+        r = session.head(url, timeout=30, allow_redirects=True)
+        r.raise_for_status()
+    except requests.RequestException as e:
+        print(f"        Aviso: não foi possível revalidar {url}: {e}")
+        return False
+
+    atuais = _validadores(r.headers)
+    alterada = any(
+        registro.get(campo) and atuais[campo] and registro[campo] != atuais[campo]
+        for campo in ("etag", "last_modified")
+    )
+
+    # Completa validadores ausentes para as próximas execuções
+    for campo, valor in atuais.items():
+        if not registro.get(campo):
+            registro[campo] = valor
+
+    return alterada
+
+
+def baixar_zip(
+    ano: int,
+    trimestre: int,
+    nome_arquivo: str,
+    session: requests.Session = None,
+    manifesto: dict = None
+) -> bool:
     """
     Baixa um arquivo ZIP de demonstrações contábeis.
     
+    Downloads interrompidos ficam em `<arquivo>.part` e são retomados
+    na próxima execução em vez de recomeçar do zero.
+    
+    Com `manifesto`, um arquivo já existente é revalidado (HEAD com
+    ETag/Last-Modified) e baixado de novo se a ANS republicou o trimestre.
+    Tamanho, SHA-256 e validadores ficam registrados no manifesto.
+    
     Args:
         ano: Ano do arquivo.
         trimestre: Trimestre (1-4).
         nome_arquivo: Nome do arquivo ZIP.
+        session: Sessão HTTP compartilhada (opcional).
+        manifesto: Manifesto de fontes (opcional).
         
     Returns:
         True se baixou com sucesso ou já existia, False se falhou.
@@ -105,38 +420,195 @@ def baixar_zip(ano: int, trimestre: int, nome_arquivo: str) -> bool:
     nome_local = f"{ano}_{trimestre}T_{nome_arquivo}"
     caminho_arquivo = os.path.join(RAW_DATA_DIR, nome_local)
 
+    url_arquivo = urljoin(BASE_URL, f"{ano}/{nome_arquivo}")
+    session = session or requests.Session()
+
     if os.path.exists(caminho_arquivo):
-        print(f"        ✓ Já existe: {nome_local}")
-        return True
+        if manifesto is None:
+            print(f"        ✓ Já existe: {nome_local}")
+            return True
 
-    url_arquivo = urljoin(BASE_URL, f"{ano}/{nome_arquivo}")
+        registro = manifesto["fontes"].get(nome_local, {})
+        if not _fonte_alterada(session, url_arquivo, registro):
+            registrar_fonte(manifesto, nome_local, caminho_arquivo, url_arquivo,
+                            registro.get("etag"), registro.get("last_modified"))
+            print(f"        ✓ Já existe: {nome_local}")
+            return True
+
+        print(f"        ↻ Republicado na fonte: {nome_local}")
+        # Um .part antigo pertence à versão anterior do arquivo
+        _descartar_parcial(caminho_arquivo + ".part")
 
     try:
-        with requests.get(url_arquivo, stream=True, timeout=120) as r:
-            r.raise_for_status()
-            with open(caminho_arquivo, "wb") as f:
-                for chunk in r.iter_content(chunk_size=8192):
-                    f.write(chunk)
+        validadores = _baixar_com_retomada(session, url_arquivo, caminho_arquivo)
+        if manifesto is not None:
+            registrar_fonte(manifesto, nome_local, caminho_arquivo, url_arquivo, **validadores)
         print(f"        ✓ Baixado: {nome_local}")
         return True
     except requests.RequestException as e:
         print(f"        ✗ Erro ao baixar {nome_local}: {e}")
         return False
 
-def baixar_cadastro_operadoras():
+
+def baixar_trimestres(
+    trimestres,
+    max_workers: int = MAX_DOWNLOADS_PARALELOS,
+    manifesto: dict = None
+) -> dict:
+    """
+    Baixa os ZIPs de vários trimestres em paralelo.
+    
+    Args:
+        trimestres: Lista de tuplas (ano, trimestre, nome_arquivo).
+        max_workers: Número de downloads simultâneos.
+        manifesto: Manifesto de fontes (opcional; sem ele, é carregado e
+            salvo aqui).
+        
+    Returns:
+        Dicionário {(ano, trimestre): bool} com o resultado de cada download.
+    """
+    if not trimestres:
+        return {}
+
+    salvar = manifesto is None
+    if salvar:
+        manifesto = carregar_manifesto()
+
+    with criar_sessao(max_workers) as session:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futuros = {
+                (ano, trimestre): executor.submit(
+                    baixar_zip, ano, trimestre, arquivo, session, manifesto
+                )
+                for ano, trimestre, arquivo in trimestres
+            }
+            resultados = {chave: futuro.result() for chave, futuro in futuros.items()}
+
+    if salvar:
+        salvar_manifesto(manifesto)
+    return resultados
+
+def _baixar_condicional(session: requests.Session, url: str, caminho: str, registro: dict):
+    """
+    GET condicional (If-None-Match/If-Modified-Since) gravado em streaming.
+    
+    O conteúdo vai para `<caminho>.part` e só substitui o arquivo final
+    após o download completo, via rename atômico.
+    
+    Returns:
+        Validadores HTTP da resposta, ou None se a fonte não mudou (304).
+    
+    Raises:
+        requests.RequestException: Se o download falhar.
+    """
+    headers = {}
+    if os.path.exists(caminho):
+        if registro.get("etag"):
+            headers["If-None-Match"] = registro["etag"]
+        if registro.get("last_modified"):
+            headers["If-Modified-Since"] = registro["last_modified"]
+
+    caminho_parcial = caminho + ".part"
+
+    with session.get(url, headers=headers, stream=True, timeout=(10, 120)) as r:
+        if r.status_code == 304:
+            return None
+
+        r.raise_for_status()
+
+        with open(caminho_parcial, "wb") as f:
+            for chunk in r.iter_content(chunk_size=CHUNK_DOWNLOAD):
+                f.write(chunk)
+
+        esperado = r.headers.get("Content-Length")
+        gravado = os.path.getsize(caminho_parcial)
+        if esperado is not None and gravado < int(esperado):
+            raise requests.RequestException(
+                f"Download incompleto ({gravado}/{esperado} bytes)"
+            )
+
+        validadores = _validadores(r.headers)
+
+    os.replace(caminho_parcial, caminho)
+    return validadores
+
+
+def baixar_cadastro_operadoras(
+    manifesto: dict = None,
+    idade_maxima: float = IDADE_MAXIMA_CADASTRO,
+    session: requests.Session = None
+) -> str:
+    """
+    Mantém atualizado o cadastro de operadoras ativas da ANS.
+    
+    Um arquivo verificado há menos de `idade_maxima` segundos é usado sem
+    acessar a rede. Depois disso, é revalidado com GET condicional
+    (ETag/Last-Modified): se não mudou, nada é baixado; se mudou, o novo
+    conteúdo é gravado em streaming e de forma atômica. O cache do
+    cadastro tratado (src.cadastro) depende do hash do arquivo, então só
+    é reconstruído quando o conteúdo realmente muda.
+    
+    Args:
+        manifesto: Manifesto de fontes (opcional; sem ele, é carregado e
+            salvo aqui).
+        idade_maxima: Segundos entre revalidações na fonte.
+        session: Sessão HTTP (opcional).
+        
+    Returns:
+        Caminho do CSV do cadastro.
+    
+    Raises:
+        requests.RequestException: Se o download falhar e não houver
+            cópia local.
+    """
     os.makedirs(PASTA_SAIDA, exist_ok=True)
     caminho = os.path.join(PASTA_SAIDA, "operadoras_ativas.csv")
 
-    if os.path.exists(caminho):
-        print("Cadastro de operadoras já existe, pulando download.")
+    salvar = manifesto is None
+    if salvar:
+        manifesto = carregar_manifesto()
+
+    registro = manifesto["fontes"].get(NOME_CADASTRO, {})
+    agora = time.time()
+
+    if os.path.exists(caminho) and agora - registro.get("verificado_em", 0) < idade_maxima:
+        print("Cadastro de operadoras verificado recentemente, pulando download.")
         return caminho
 
-    print("⬇️ Baixando cadastro de operadoras ativas...")
-    response = requests.get(URL_CADASTRO_OPERADORAS)
-    response.raise_for_status()
+    print("⬇️ Verificando cadastro de operadoras ativas...")
+    sessao = session or criar_sessao(1)
+    try:
+        validadores = _baixar_condicional(sessao, URL_CADASTRO_OPERADORAS, caminho, registro)
+    except requests.RequestException as e:
+        if not os.path.exists(caminho):
+            raise
+        print(f"      Aviso: não foi possível atualizar o cadastro, usando cópia local: {e}")
+        return caminho
+    finally:
+        if session is None:
+            sessao.close()
+
+    if validadores is None:
+        print("Cadastro de operadoras não mudou na fonte.")
+        validadores = {}
+    else:
+        print("Cadastro salvo em:", caminho)
+
+    sha_anterior = registro.get("sha256")
+    entrada = registrar_fonte(
+        manifesto,
+        NOME_CADASTRO,
+        caminho,
+        URL_CADASTRO_OPERADORAS,
+        validadores.get("etag"),
+        validadores.get("last_modified")
+    )
+    entrada["verificado_em"] = agora
+
+    if sha_anterior and sha_anterior != entrada["sha256"]:
+        print("      Cadastro alterado: dados de enriquecimento serão reconstruídos.")
 
-    with open(caminho, "wb") as f:
-        f.write(response.content)
+    if salvar:
+        salvar_manifesto(manifesto)
 
-    print("Cadastro salvo em:", caminho)
-    return caminho
\ No newline at end of file
+    return caminho
@@ -1,8 +1,13 @@
 import pandas as pd
+from src.cadastro import carregar_cadastro, indexar_registros
 from src.downloader import baixar_cadastro_operadoras
 
 
-def enriquecer_dados(df_despesas: pd.DataFrame) -> pd.DataFrame:
+def enriquecer_dados(
+    df_despesas: pd.DataFrame,
+    manifesto: dict = None,
+    caminho_cadastro: str = None
+) -> pd.DataFrame:
     """
     Enriquece os dados de despesas com informações cadastrais.
     
@@ -13,55 +18,34 @@ def enriquecer_dados(df_despesas: pd.DataFrame) -> pd.DataFrame:
     
     Args:
         df_despesas: DataFrame com dados consolidados de despesas.
+        manifesto: Manifesto do pipeline, onde o download do cadastro é
+            registrado (opcional).
+        caminho_cadastro: CSV do cadastro já baixado (opcional; sem ele, o
+            cadastro é baixado/revalidado aqui).
         
     Returns:
         DataFrame enriquecido com dados cadastrais.
     """
-    caminho = baixar_cadastro_operadoras()
+    caminho = caminho_cadastro or baixar_cadastro_operadoras(manifesto)
 
-    df_cadastro = pd.read_csv(
-        caminho,
-        sep=";",
-        dtype=str,
-        encoding="latin1"
-    )
-
-    df_cadastro.columns = [c.lower() for c in df_cadastro.columns]
-
-    # Mapeamento resiliente de colunas
-    mapa_colunas = {}
-    
-    for col in df_cadastro.columns:
-        if col == "registro_operadora":
-            mapa_colunas[col] = "registro_operadora"
-        elif col == "cnpj":
-            mapa_colunas[col] = "cnpj"
-        elif col == "modalidade":
-            mapa_colunas[col] = "modalidade"
-        elif col == "uf":
-            mapa_colunas[col] = "uf"
-
-    df_cadastro = df_cadastro.rename(columns=mapa_colunas)
-
-    # Limpar aspas dos valores (formato CSV do cadastro)
-    for col in ["cnpj", "registro_operadora", "modalidade", "uf"]:
-        if col in df_cadastro.columns:
-            df_cadastro[col] = df_cadastro[col].str.strip('"')
-
-    # Drop duplicates apenas se a coluna existir
-    if "registro_operadora" in df_cadastro.columns:
-        df_cadastro = df_cadastro.drop_duplicates(
-            subset="registro_operadora",
-            keep="first"
-        )
+    # Cadastro já tratado (cache Parquet invalidado quando o CSV muda)
+    df_cadastro = carregar_cadastro(caminho)
 
     # Merge com a coluna correta
     if "registro_operadora" in df_cadastro.columns:
-        df_final = df_despesas.merge(
-            df_cadastro,
-            left_on="REG_ANS",
-            right_on="registro_operadora",
-            how="inner"  # Estratégia: manter apenas registros que encontram match no cadastro
+        # Busca indexada: cada REG_ANS distinto é procurado uma vez e as
+        # linhas são resolvidas por códigos inteiros (equivale a um merge
+        # inner que preserva a ordem das despesas)
+        posicoes = indexar_registros(df_cadastro, df_despesas["REG_ANS"])
+        # Estratégia: manter apenas registros que encontram match no cadastro
+        encontrados = posicoes >= 0
+
+        df_final = pd.concat(
+            [
+                df_despesas[encontrados].reset_index(drop=True),
+                df_cadastro.iloc[posicoes[encontrados]].reset_index(drop=True)
+            ],
+            axis=1
         )
         
         registros_sem_match = len(df_despesas) - len(df_final)
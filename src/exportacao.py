@@ -0,0 +1,94 @@
+import gzip
+import os
+import zipfile
+from contextlib import ExitStack
+
+# Linhas codificadas por vez; limita a memória do texto CSV em trânsito
+TAMANHO_BLOCO_EXPORTACAO = 100_000
+
+# Saídas opcionais além do CSV/ZIP: "gzip" (.csv.gz) e "parquet" (.parquet)
+FORMATOS_EXTRAS = ("gzip", "parquet")
+
+
+def exportar_csv(
+    df,
+    caminho_csv: str,
+    caminho_zip: str = None,
+    formatos=(),
+    sep: str = ";",
+    encoding: str = "utf-8",
+    tamanho_bloco: int = TAMANHO_BLOCO_EXPORTACAO
+) -> list:
+    """
+    Exporta um DataFrame em CSV, codificando cada linha uma única vez.
+
+    Cada bloco de texto gerado é gravado ao mesmo tempo no .csv, na
+    entrada do ZIP e (opcional) no .csv.gz, sem reler o CSV do disco para
+    compactá-lo. Os arquivos são gravados em temporários e renomeados no
+    final, então uma exportação interrompida não deixa saída pela metade.
+
+    Args:
+        df: DataFrame a exportar.
+        caminho_csv: Caminho do CSV (o nome também é usado dentro do ZIP).
+        caminho_zip: Caminho do ZIP (opcional).
+        formatos: Saídas extras entre FORMATOS_EXTRAS.
+        sep: Separador do CSV.
+        encoding: Codificação do CSV.
+        tamanho_bloco: Linhas codificadas por vez.
+
+    Returns:
+        Lista com os caminhos gerados.
+    """
+    for formato in formatos:
+        if formato not in FORMATOS_EXTRAS:
+            raise ValueError(f"Formato de exportação inválido: {formato}")
+
+    os.makedirs(os.path.dirname(caminho_csv) or ".", exist_ok=True)
+
+    gerados = [caminho_csv]
+    if caminho_zip:
+        gerados.append(caminho_zip)
+    if "gzip" in formatos:
+        gerados.append(f"{caminho_csv}.gz")
+
+    temporarios = {caminho: f"{caminho}.{os.getpid()}.tmp" for caminho in gerados}
+
+    with ExitStack() as pilha:
+        destinos = [pilha.enter_context(open(temporarios[caminho_csv], "wb"))]
+
+        if caminho_zip:
+            zipf = pilha.enter_context(
+                zipfile.ZipFile(temporarios[caminho_zip], "w", zipfile.ZIP_DEFLATED)
+            )
+            destinos.append(pilha.enter_context(
+                zipf.open(os.path.basename(caminho_csv), "w", force_zip64=True)
+            ))
+
+        if "gzip" in formatos:
+            destinos.append(pilha.enter_context(
+                gzip.open(temporarios[f"{caminho_csv}.gz"], "wb")
+            ))
+
+        # Ao menos um bloco, para o cabeçalho sair mesmo sem linhas
+        for inicio in range(0, max(len(df), 1), tamanho_bloco):
+            bloco = df.iloc[inicio:inicio + tamanho_bloco].to_csv(
+                sep=sep,
+                index=False,
+                header=inicio == 0
+            ).encode(encoding)
+
+            for destino in destinos:
+                destino.write(bloco)
+
+    for caminho, temporario in temporarios.items():
+        os.replace(temporario, caminho)
+
+    if "parquet" in formatos:
+        caminho_parquet = os.path.splitext(caminho_csv)[0] + ".parquet"
+        try:
+            df.to_parquet(caminho_parquet, index=False)
+            gerados.append(caminho_parquet)
+        except ImportError:
+            print(f"      Aviso: pyarrow não instalado, Parquet não gerado: {caminho_parquet}")
+
+    return gerados
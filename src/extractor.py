@@ -1,7 +1,10 @@
 import os
+import shutil
 import zipfile
 import re
 
+from src.manifest import carregar_manifesto, registrar_fonte, salvar_manifesto
+
 RAW_DIR = "data/raw"
 EXTRACTED_DIR = "data/extracted"
 
@@ -11,12 +14,35 @@ def criar_diretorio(path: str):
         os.makedirs(path)
 
 
-def extrair_zips():
+def localizar_zip(ano: int, trimestre, pasta: str = RAW_DIR):
+    """
+    Retorna o caminho do ZIP bruto de um trimestre (ex: data/raw/2025_1T_1T2025.zip)
+    ou None se não houver.
+    """
+    if not os.path.exists(pasta):
+        return None
+
+    prefixo = f"{ano}_{str(trimestre).lstrip('0') or '0'}T_"
+    for arquivo in sorted(os.listdir(pasta)):
+        if arquivo.startswith(prefixo) and arquivo.lower().endswith(".zip"):
+            return os.path.join(pasta, arquivo)
+
+    return None
+
+
+def extrair_zips(manifesto: dict = None, chaves=None):
     """
     Extrai todos os arquivos ZIP da pasta raw para extracted.
     
     Estrutura de saída: data/extracted/YYYY_QT/
-    Pula arquivos já extraídos.
+    Pula pastas já extraídas do mesmo ZIP (mesmo SHA-256 no manifesto).
+    Se o ZIP mudou (trimestre republicado), a pasta é refeita.
+    
+    Args:
+        manifesto: Manifesto do pipeline (opcional; sem ele, é carregado e
+            salvo aqui).
+        chaves: Trimestres a extrair, como "AAAA_QT" (opcional; sem elas,
+            todos os ZIPs da pasta raw).
     """
     criar_diretorio(EXTRACTED_DIR)
     
@@ -24,7 +50,11 @@ def extrair_zips():
         print(f"      Aviso: Pasta {RAW_DIR} não existe.")
         return
 
-    for arquivo in os.listdir(RAW_DIR):
+    salvar = manifesto is None
+    if salvar:
+        manifesto = carregar_manifesto()
+
+    for arquivo in sorted(os.listdir(RAW_DIR)):
         if not arquivo.lower().endswith(".zip"):
             continue
 
@@ -38,18 +68,42 @@ def extrair_zips():
         ano = match.group(1)
         trimestre = match.group(2)
 
-        destino = os.path.join(EXTRACTED_DIR, f"{ano}_{trimestre}T")
+        chave = f"{ano}_{trimestre}T"
+        if chaves is not None and chave not in chaves:
+            continue
+
+        destino = os.path.join(EXTRACTED_DIR, chave)
         criar_diretorio(destino)
 
+        caminho_zip = os.path.join(RAW_DIR, arquivo)
+        fonte = registrar_fonte(manifesto, arquivo, caminho_zip)
+        registro = manifesto["extraidos"].get(chave, {})
+
         if os.listdir(destino):
-            print(f"      ✓ Já extraído: {destino}")
-            continue
+            if registro.get("origem_sha256") == fonte["sha256"]:
+                print(f"      ✓ Já extraído: {destino}")
+                continue
 
-        caminho_zip = os.path.join(RAW_DIR, arquivo)
+            # Conteúdo diferente do que foi extraído: refaz a pasta
+            shutil.rmtree(destino)
+            criar_diretorio(destino)
 
         try:
             with zipfile.ZipFile(caminho_zip, "r") as zip_ref:
                 zip_ref.extractall(destino)
+                arquivos = {
+                    info.filename: {"tamanho": info.file_size, "crc32": f"{info.CRC:08x}"}
+                    for info in zip_ref.infolist()
+                    if not info.is_dir()
+                }
+            manifesto["extraidos"][chave] = {
+                "origem": arquivo,
+                "origem_sha256": fonte["sha256"],
+                "arquivos": arquivos
+            }
             print(f"      ✓ Extraído: {arquivo} → {destino}")
         except zipfile.BadZipFile as e:
-            print(f"      ✗ Erro ao extrair {arquivo}: {e}")
\ No newline at end of file
+            print(f"      ✗ Erro ao extrair {arquivo}: {e}")
+
+    if salvar:
+        salvar_manifesto(manifesto)
@@ -0,0 +1,209 @@
+import csv
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # Windows: sem pico de RSS
+    resource = None
+
+# Métricas de execução (tempo, CPU, memória e linhas) por etapa do pipeline
+# e por arquivo processado, gravadas em JSON + CSV ao final de cada execução
+CAMINHO_RELATORIO_EXECUCAO = "data/output/relatorio_execucao.json"
+
+# Colunas do CSV, na ordem; campos extras vão depois, em ordem alfabética
+COLUNAS_RELATORIO = [
+    "tipo", "nome", "situacao", "inicio", "duracao_s", "cpu_s",
+    "rss_pico_mb", "rss_pico_delta_mb", "tracemalloc_pico_mb",
+    "linhas_entrada", "linhas_saida",
+]
+
+_metricas = []
+_trava = threading.Lock()
+_local = threading.local()
+_config = {"log": None}
+
+
+def configurar(log: str = None, usar_tracemalloc: bool = False) -> None:
+    """
+    Reinicia a coleta de métricas.
+
+    Args:
+        log: Arquivo onde cada métrica é acrescentada como uma linha JSON
+            assim que medida ("-" para stderr; None desativa).
+        usar_tracemalloc: Liga o tracemalloc para registrar o pico de
+            memória alocada pelo Python em cada medição. Tem custo alto de
+            CPU; etapas simultâneas compartilham o mesmo pico.
+    """
+    with _trava:
+        _metricas.clear()
+    _config["log"] = log
+
+    if usar_tracemalloc and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    elif not usar_tracemalloc and tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def _rss_pico_mb():
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa KB; macOS, bytes
+    return pico / (1024 * 1024) if sys.platform == "darwin" else pico / 1024
+
+
+def _pilha() -> list:
+    if not hasattr(_local, "pilha"):
+        _local.pilha = []
+        # Pico de tracemalloc já observado por medição da pilha
+        _local.picos = []
+    return _local.pilha
+
+
+def contar_linhas(valor):
+    """Linhas de um DataFrame (ou soma de uma lista deles); None para outros valores."""
+    if isinstance(valor, pd.DataFrame):
+        return len(valor)
+    if isinstance(valor, (list, tuple)) and valor and all(isinstance(v, pd.DataFrame) for v in valor):
+        return sum(len(v) for v in valor)
+    return None
+
+
+def somar(campo: str, quantidade: int) -> None:
+    """Soma `quantidade` ao `campo` da medição em andamento nesta thread (se houver)."""
+    pilha = _pilha()
+    if pilha:
+        pilha[-1][campo] = (pilha[-1].get(campo) or 0) + quantidade
+
+
+def registrar(metrica: dict) -> None:
+    """Guarda uma métrica (inclusive vinda de outro processo) e a envia ao log, se ativo."""
+    with _trava:
+        _metricas.append(metrica)
+
+        if _config["log"]:
+            linha = json.dumps(metrica, ensure_ascii=False, default=str)
+            if _config["log"] == "-":
+                print(linha, file=sys.stderr)
+            else:
+                with open(_config["log"], "a", encoding="utf-8") as f:
+                    f.write(linha + "\n")
+
+
+@contextmanager
+def medir(tipo: str, nome: str, guardar: bool = True, **campos):
+    """
+    Mede o bloco: tempo de parede, CPU da thread, pico de RSS do processo
+    e, com tracemalloc ligado, o pico de memória Python alocada. Medições
+    aninhadas (ex: arquivos dentro de uma etapa) não encurtam o pico da
+    medição externa.
+
+    O dicionário devolvido pode receber linhas_entrada/linhas_saida e
+    outros campos; `somar` acumula nele a partir de funções chamadas
+    dentro do bloco, na mesma thread.
+
+    Args:
+        tipo: "etapa" ou "arquivo".
+        nome: Nome da etapa ou caminho do arquivo.
+        guardar: Registra a métrica ao final. Com False, quem chamou a
+            devolve (ex: de um processo do pool) e registra no processo principal.
+        **campos: Campos extras (ano, trimestre...).
+
+    Yields:
+        Dicionário da métrica.
+    """
+    metrica = {
+        "tipo": tipo,
+        "nome": nome,
+        "situacao": "executada",
+        "inicio": datetime.now().isoformat(timespec="milliseconds"),
+        "linhas_entrada": None,
+        "linhas_saida": None,
+        **campos,
+    }
+    rss_inicio = _rss_pico_mb()
+    pilha = _pilha()
+    picos = _local.picos
+
+    if tracemalloc.is_tracing():
+        # reset_peak zera o pico de todos: guarda o da medição externa antes
+        if picos:
+            picos[-1] = max(picos[-1], tracemalloc.get_traced_memory()[1])
+        tracemalloc.reset_peak()
+
+    pilha.append(metrica)
+    picos.append(0)
+    inicio, cpu_inicio = time.perf_counter(), time.thread_time()
+
+    try:
+        yield metrica
+    except BaseException:
+        metrica["situacao"] = "erro"
+        raise
+    finally:
+        metrica["duracao_s"] = round(time.perf_counter() - inicio, 6)
+        metrica["cpu_s"] = round(time.thread_time() - cpu_inicio, 6)
+        pilha.pop()
+        pico = picos.pop()
+
+        rss_fim = _rss_pico_mb()
+        metrica["rss_pico_mb"] = rss_fim and round(rss_fim, 1)
+        metrica["rss_pico_delta_mb"] = rss_fim and round(rss_fim - rss_inicio, 1)
+        metrica["tracemalloc_pico_mb"] = None
+        if tracemalloc.is_tracing():
+            pico = max(pico, tracemalloc.get_traced_memory()[1])
+            metrica["tracemalloc_pico_mb"] = round(pico / (1024 * 1024), 1)
+            # O pico desta medição também é pico da medição externa
+            if picos:
+                picos[-1] = max(picos[-1], pico)
+
+        if guardar:
+            registrar(metrica)
+
+
+def metricas() -> list:
+    """Cópia das métricas registradas desde o último `configurar`."""
+    with _trava:
+        return list(_metricas)
+
+
+def salvar_relatorio(caminho: str = CAMINHO_RELATORIO_EXECUCAO) -> str:
+    """
+    Grava o relatório da execução em JSON e, ao lado, em CSV (mesmo nome).
+
+    Returns:
+        Caminho do JSON.
+    """
+    registros = metricas()
+    os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+
+    temporario = caminho + ".tmp"
+    with open(temporario, "w", encoding="utf-8") as f:
+        json.dump(
+            {"gerado_em": datetime.now().isoformat(timespec="seconds"), "metricas": registros},
+            f,
+            indent=2,
+            ensure_ascii=False,
+            default=str
+        )
+    os.replace(temporario, caminho)
+
+    extras = sorted({c for m in registros for c in m} - set(COLUNAS_RELATORIO))
+    caminho_csv = os.path.splitext(caminho)[0] + ".csv"
+    temporario = caminho_csv + ".tmp"
+    with open(temporario, "w", encoding="utf-8", newline="") as f:
+        escritor = csv.DictWriter(f, fieldnames=COLUNAS_RELATORIO + extras, delimiter=";")
+        escritor.writeheader()
+        escritor.writerows(registros)
+    os.replace(temporario, caminho_csv)
+
+    return caminho
@@ -0,0 +1,117 @@
+import os
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+# Lote colunar trocado entre parser e consolidador.
+# REG_ANS, Ano e Trimestre são categóricos (códigos de 1-2 bytes por linha)
+# e ValorDespesas é float64. CNPJ e RazaoSocial não existem na fonte e só
+# são acrescentados na exportação do consolidado.
+COLUNAS_LOTE = ["REG_ANS", "Ano", "Trimestre", "ValorDespesas"]
+COLUNAS_CATEGORICAS = ["REG_ANS", "Ano", "Trimestre"]
+
+
+def _constante(valor, n: int) -> pd.Categorical:
+    return pd.Categorical.from_codes(np.zeros(n, dtype=np.int8), categories=[valor])
+
+
+def criar_lote(reg_ans, ano: int, trimestre, valores) -> pd.DataFrame:
+    """
+    Monta um lote com os registros de um arquivo (ou trimestre).
+
+    Args:
+        reg_ans: Registros ANS (Categorical ou array de textos).
+        ano: Ano de todos os registros.
+        trimestre: Trimestre de todos os registros (guardado como texto).
+        valores: Valores das despesas (array de float).
+
+    Returns:
+        DataFrame com COLUNAS_LOTE.
+    """
+    valores = np.asarray(valores, dtype=np.float64)
+
+    if not isinstance(reg_ans, pd.Categorical):
+        reg_ans = pd.Categorical(np.asarray(reg_ans, dtype=object).astype(str))
+
+    return pd.DataFrame({
+        "REG_ANS": reg_ans,
+        "Ano": _constante(int(ano), len(valores)),
+        "Trimestre": _constante(str(trimestre), len(valores)),
+        "ValorDespesas": valores
+    })
+
+
+def lote_vazio() -> pd.DataFrame:
+    return pd.DataFrame({
+        "REG_ANS": pd.Categorical([]),
+        "Ano": pd.Categorical([]),
+        "Trimestre": pd.Categorical([]),
+        "ValorDespesas": np.array([], dtype=np.float64)
+    })
+
+
+def concatenar_lotes(lotes) -> pd.DataFrame:
+    """
+    Concatena lotes preservando os tipos categóricos.
+
+    As categorias são unidas e ordenadas, então ordenar pelos códigos
+    equivale a ordenar pelos valores.
+    """
+    lotes = [lote for lote in lotes if not lote.empty]
+
+    if not lotes:
+        return lote_vazio()
+
+    colunas = {
+        coluna: union_categoricals(
+            [lote[coluna].array for lote in lotes],
+            sort_categories=True
+        )
+        for coluna in COLUNAS_CATEGORICAS
+    }
+    colunas["ValorDespesas"] = np.concatenate(
+        [lote["ValorDespesas"].to_numpy() for lote in lotes]
+    )
+
+    return pd.DataFrame(colunas)[COLUNAS_LOTE]
+
+
+def salvar_lote_parquet(lote: pd.DataFrame, caminho: str) -> bool:
+    """
+    Grava um lote em Parquet de forma atômica (tipos categóricos preservados).
+
+    Returns:
+        False se o suporte a Parquet (pyarrow) não estiver instalado.
+    """
+    os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+    temporario = f"{caminho}.{os.getpid()}.tmp"
+
+    try:
+        lote.to_parquet(temporario, index=False)
+    except ImportError:
+        return False
+
+    os.replace(temporario, caminho)
+    return True
+
+
+def ler_lote_parquet(caminho: str):
+    """Lê um lote gravado por salvar_lote_parquet (None se ausente ou ilegível)."""
+    if not os.path.exists(caminho):
+        return None
+
+    try:
+        lote = pd.read_parquet(caminho)
+    except (ImportError, OSError, ValueError) as e:
+        print(f"Aviso: cache ilegível, ignorando {caminho}: {e}")
+        return None
+
+    if lote.empty:
+        return lote_vazio()
+
+    # O Parquet devolve categorias de inteiros (Ano) como coluna comum
+    for coluna in COLUNAS_CATEGORICAS:
+        if not isinstance(lote[coluna].dtype, pd.CategoricalDtype):
+            lote[coluna] = lote[coluna].astype("category")
+
+    return lote[COLUNAS_LOTE]
@@ -0,0 +1,131 @@
+import hashlib
+import json
+import os
+
+CAMINHO_MANIFESTO = "data/manifest.json"
+
+SECOES = ("fontes", "extraidos", "artefatos", "etapas")
+
+
+def carregar_manifesto(caminho: str = CAMINHO_MANIFESTO) -> dict:
+    """
+    Carrega o manifesto de fontes e artefatos do pipeline.
+
+    Estrutura:
+    - fontes: ZIPs brutos (tamanho, sha256, ETag/Last-Modified, URL)
+    - extraidos: pastas extraídas (ZIP de origem e arquivos com CRC32)
+    - artefatos: saídas derivadas e as entradas usadas para gerá-las
+    - etapas: checkpoints das etapas do pipeline (ver src.pipeline)
+
+    Returns:
+        Dicionário do manifesto (vazio se ainda não existir).
+    """
+    manifesto = {}
+    if os.path.exists(caminho):
+        try:
+            with open(caminho, encoding="utf-8") as f:
+                manifesto = json.load(f)
+        except (OSError, ValueError):
+            print(f"      Aviso: manifesto ilegível, recriando: {caminho}")
+            manifesto = {}
+
+    for secao in SECOES:
+        manifesto.setdefault(secao, {})
+    return manifesto
+
+
+def salvar_manifesto(manifesto: dict, caminho: str = CAMINHO_MANIFESTO) -> None:
+    """Grava o manifesto de forma atômica."""
+    os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+    temporario = caminho + ".tmp"
+    with open(temporario, "w", encoding="utf-8") as f:
+        json.dump(manifesto, f, indent=2, sort_keys=True)
+    os.replace(temporario, caminho)
+
+
+def hash_arquivo(caminho: str, tamanho_bloco: int = 1024 * 1024) -> str:
+    """Calcula o SHA-256 de um arquivo lendo em blocos."""
+    h = hashlib.sha256()
+    with open(caminho, "rb") as f:
+        for bloco in iter(lambda: f.read(tamanho_bloco), b""):
+            h.update(bloco)
+    return h.hexdigest()
+
+
+def descrever_arquivo(caminho: str, anterior: dict = None) -> dict:
+    """
+    Retorna tamanho, mtime e SHA-256 de um arquivo.
+
+    Se `anterior` tiver o mesmo tamanho e mtime, reaproveita o hash
+    registrado em vez de reler o arquivo.
+    """
+    stat = os.stat(caminho)
+    descricao = {"tamanho": stat.st_size, "mtime": stat.st_mtime_ns}
+
+    if (
+        anterior
+        and anterior.get("sha256")
+        and anterior.get("tamanho") == descricao["tamanho"]
+        and anterior.get("mtime") == descricao["mtime"]
+    ):
+        descricao["sha256"] = anterior["sha256"]
+    else:
+        descricao["sha256"] = hash_arquivo(caminho)
+
+    return descricao
+
+
+def registrar_fonte(
+    manifesto: dict,
+    chave: str,
+    caminho: str,
+    url: str = None,
+    etag: str = None,
+    last_modified: str = None
+) -> dict:
+    """Registra (ou atualiza) um ZIP bruto no manifesto."""
+    anterior = manifesto["fontes"].get(chave, {})
+    entrada = descrever_arquivo(caminho, anterior)
+    entrada.update({
+        "url": url or anterior.get("url"),
+        "etag": etag or anterior.get("etag"),
+        "last_modified": last_modified or anterior.get("last_modified"),
+    })
+    manifesto["fontes"][chave] = entrada
+    return entrada
+
+
+def impressao_trimestre(manifesto: dict, chave: str, extraido: bool = True) -> str:
+    """
+    Retorna o SHA-256 do ZIP do trimestre `chave` (ex: '2025_1T').
+
+    Com `extraido=True`, usa o ZIP de onde a pasta extraída veio; caso
+    contrário, o ZIP bruto registrado em `fontes` (leitura direta do ZIP).
+    Retorna None se nada estiver registrado.
+    """
+    if extraido:
+        return manifesto["extraidos"].get(chave, {}).get("origem_sha256")
+
+    for nome, fonte in sorted(manifesto["fontes"].items()):
+        if nome.startswith(f"{chave}_"):
+            return fonte.get("sha256")
+    return None
+
+
+def registrar_artefato(manifesto: dict, caminho: str, entradas: dict) -> None:
+    """Registra um artefato derivado e a impressão digital das suas entradas."""
+    manifesto["artefatos"][caminho] = {
+        **descrever_arquivo(caminho, manifesto["artefatos"].get(caminho)),
+        "entradas": entradas,
+    }
+
+
+def artefato_atualizado(manifesto: dict, caminho: str, entradas: dict) -> bool:
+    """
+    Indica se `caminho` existe e foi gerado exatamente a partir de `entradas`.
+    """
+    if manifesto is None or not os.path.exists(caminho):
+        return False
+
+    registro = manifesto["artefatos"].get(caminho)
+    return bool(registro) and registro.get("entradas") == entradas
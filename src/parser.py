@@ -1,32 +1,283 @@
+import numpy as np
 import pandas as pd
+import csv
+import hashlib
+import io
+import json
 import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+
+from src.extractor import localizar_zip
+from src.instrumentacao import medir, registrar, somar
+from src.lotes import (
+    concatenar_lotes,
+    criar_lote,
+    ler_lote_parquet,
+    lote_vazio,
+    salvar_lote_parquet,
+)
+from src.manifest import artefato_atualizado, impressao_trimestre, registrar_artefato
 
 DESCRICAO_FILTRO = "Despesas com Eventos / Sinistros"
 
+EXTENSOES_VALIDAS = (".csv", ".txt", ".xlsx")
+
+# "zip": lê os membros direto do ZIP em data/raw (padrão)
+# "disco": lê da pasta extraída em data/extracted (requer extrair_zips)
+MODOS_LEITURA = ("zip", "disco")
+
+# Registros normalizados por trimestre, reaproveitados enquanto o ZIP
+# de origem e a versão do parser não mudarem
+PASTA_TRIMESTRES = "data/cache/trimestres"
+# Registros normalizados por arquivo (Parquet), chaveados por caminho,
+# tamanho, mtime (ou CRC32 do membro do ZIP) e versão do parser
+PASTA_CACHE_ARQUIVOS = "data/cache/arquivos"
+USAR_CACHE_ARQUIVOS = True
+# Incrementar sempre que a normalização mudar de comportamento
+VERSAO_PARSER = 4
+
+# Colunas obrigatórias segundo análise real dos arquivos
+COLUNAS_NECESSARIAS = ["DESCRICAO", "REG_ANS", "VL_SALDO_FINAL"]
+
+# Leitura em streaming de CSV/TXT: só as colunas necessárias, com tipos
+# compactos (textos repetidos como categoria) e em blocos de tamanho fixo.
+# O pico de memória passa a depender de TAMANHO_CHUNK, não do arquivo.
+TAMANHO_CHUNK = 100_000
+DTYPES_LEITURA = {
+    "DESCRICAO": "category",
+    "REG_ANS": "category",
+    "VL_SALDO_FINAL": "object"
+}
+
 
-def ler_arquivo(caminho: str):
+def _ler_cabecalho(texto) -> list:
+    """Lê e separa apenas a primeira linha (cabeçalho) de um arquivo texto."""
+    linha = texto.readline()
+    return next(csv.reader([linha], delimiter=";"), [])
+
+
+def ler_csv_em_chunks(caminho: str, arquivo=None, tamanho_chunk: int = TAMANHO_CHUNK):
     """
-    Lê arquivos CSV/TXT ou XLSX e retorna um DataFrame.
+    Lê um CSV/TXT em blocos, apenas com COLUNAS_NECESSARIAS.
+    
+    O cabeçalho é inspecionado antes de qualquer leitura de dados: se faltar
+    alguma coluna obrigatória, o arquivo é rejeitado sem ser lido.
+    
+    Args:
+        caminho: Caminho (ou nome do membro do ZIP).
+        arquivo: Objeto de arquivo binário já aberto (opcional).
+        tamanho_chunk: Linhas por bloco.
+        
+    Yields:
+        DataFrames com até `tamanho_chunk` linhas.
     """
-    try:
-        if caminho.lower().endswith((".csv", ".txt")):
-            return pd.read_csv(
-                caminho,
+    # Um arquivo recebido aberto (membro de ZIP) é fechado por quem o abriu
+    with open(caminho, "rb") if arquivo is None else nullcontext(arquivo) as binario:
+        texto = io.TextIOWrapper(binario, encoding="latin1", newline="")
+        try:
+            colunas = _ler_cabecalho(texto)
+
+            if any(coluna not in colunas for coluna in COLUNAS_NECESSARIAS):
+                # Arquivo não serve para o processamento
+                return
+
+            yield from pd.read_csv(
+                texto,
                 sep=";",
-                encoding="latin1"
+                header=None,
+                names=colunas,
+                usecols=COLUNAS_NECESSARIAS,
+                dtype=DTYPES_LEITURA,
+                chunksize=tamanho_chunk
             )
+        finally:
+            # Não fecha o arquivo de origem junto com o wrapper
+            texto.detach()
 
-        elif caminho.lower().endswith(".xlsx"):
-            return pd.read_excel(caminho)
 
-    except Exception as e:
-        print(f"Erro ao ler arquivo {caminho}: {e}")
+def _texto_celula(valor):
+    """
+    Converte uma célula do XLSX para o texto que a normalização espera.
+
+    Números já vêm tipados da planilha; são escritos com vírgula decimal
+    para que a conversão do formato BR devolva exatamente o mesmo float.
+    """
+    if valor is None or isinstance(valor, str):
+        return valor
+
+    if isinstance(valor, float):
+        if valor.is_integer():
+            return str(int(valor))
+        return repr(valor).replace(".", ",")
+
+    return str(valor)
+
+
+def ler_xlsx_em_chunks(caminho: str, arquivo=None, tamanho_chunk: int = TAMANHO_CHUNK):
+    """
+    Lê a primeira planilha de um XLSX em blocos, apenas com COLUNAS_NECESSARIAS.
+    
+    Usa o modo somente leitura do openpyxl (linhas lidas sob demanda, sem
+    montar a planilha inteira). A leitura para logo após o cabeçalho se
+    faltar alguma coluna obrigatória.
+    
+    Args:
+        caminho: Caminho (ou nome do membro do ZIP).
+        arquivo: Objeto de arquivo binário já aberto (opcional).
+        tamanho_chunk: Linhas por bloco.
+        
+    Yields:
+        DataFrames com até `tamanho_chunk` linhas, nos mesmos tipos do CSV.
+    """
+    from openpyxl import load_workbook
+
+    if arquivo is not None:
+        # openpyxl faz seek aleatório; membros de ZIP são lentos para isso
+        arquivo = io.BytesIO(arquivo.read())
+
+    livro = load_workbook(
+        caminho if arquivo is None else arquivo,
+        read_only=True,
+        data_only=True
+    )
+
+    try:
+        linhas = livro.worksheets[0].iter_rows(values_only=True)
+        cabecalho = [str(c).strip() if c is not None else "" for c in next(linhas, ())]
+
+        if any(coluna not in cabecalho for coluna in COLUNAS_NECESSARIAS):
+            # Arquivo não serve para o processamento
+            return
+
+        posicoes = [cabecalho.index(coluna) for coluna in COLUNAS_NECESSARIAS]
+        blocos = {coluna: [] for coluna in COLUNAS_NECESSARIAS}
+
+        def _bloco():
+            chunk = pd.DataFrame(blocos).astype(DTYPES_LEITURA)
+            for valores in blocos.values():
+                valores.clear()
+            return chunk
+
+        for linha in linhas:
+            celulas = [linha[i] if i < len(linha) else None for i in posicoes]
+
+            if all(celula is None for celula in celulas):
+                # Linhas em branco (comuns no fim da planilha)
+                continue
+
+            for coluna, celula in zip(COLUNAS_NECESSARIAS, celulas):
+                blocos[coluna].append(_texto_celula(celula))
+
+            if len(blocos["REG_ANS"]) >= tamanho_chunk:
+                yield _bloco()
+
+        if blocos["REG_ANS"]:
+            yield _bloco()
+    finally:
+        livro.close()
+
+
+def _como_texto(serie: pd.Series) -> pd.Series:
+    """
+    Equivalente vetorizado de `str(valor)` aplicado a cada linha.
+    
+    Nulos viram 'nan', como acontecia na conversão linha a linha.
+    """
+    texto = serie.astype(str)
+    nulos = serie.isna()
+
+    if nulos.any():
+        texto = texto.where(~nulos, "nan")
+
+    return texto
+
+
+def _categoria_texto(serie: pd.Series) -> pd.Categorical:
+    """
+    Equivalente a `str(valor).strip()` por linha, devolvido como Categorical.
+    
+    A conversão é feita apenas nas categorias (poucas) e os códigos são
+    remapeados; as categorias resultantes ficam ordenadas.
+    """
+    if not isinstance(serie.dtype, pd.CategoricalDtype):
+        serie = serie.astype("category")
+
+    categorias = _como_texto(pd.Series(serie.cat.categories)).str.strip().to_numpy(dtype=str)
+    codigos = serie.cat.codes.to_numpy()
+
+    if (codigos < 0).any():
+        # Nulos viram a categoria 'nan'
+        categorias = np.append(categorias, "nan")
+        codigos = np.where(codigos < 0, len(categorias) - 1, codigos)
+
+    unicas, remapeamento = np.unique(categorias, return_inverse=True)
+    return pd.Categorical.from_codes(remapeamento[codigos], categories=unicas.astype(object))
+
+
+def _converter_valores(texto: pd.Series):
+    """
+    Converte a coluna de valores (já com ponto decimal) para float.
+    
+    Segue exatamente a semântica de float() do Python. O caminho rápido
+    converte a coluna inteira de uma vez; só se houver valores malformados
+    os candidatos a erro são convertidos individualmente.
+    
+    Returns:
+        Tupla (valores, validos) de arrays NumPy alinhados com `texto`.
+    """
+    brutos = texto.to_numpy(dtype=object)
+
+    try:
+        return brutos.astype(np.float64), np.ones(len(brutos), dtype=bool)
+    except ValueError:
+        pass
+
+    valores = np.full(len(brutos), np.nan)
+    # Cópia gravável: no pandas 3, to_numpy() pode devolver um array somente leitura
+    validos = pd.to_numeric(texto, errors="coerce").notna().to_numpy(copy=True)
+    valores[validos] = brutos[validos].astype(np.float64)
+
+    # Restam os malformados e formas que só float() aceita ('nan', '1_000'...)
+    for i in np.flatnonzero(~validos):
+        try:
+            valor = float(brutos[i])
+        except ValueError:
+            continue
+        valores[i] = valor
+        validos[i] = True
+
+    return valores, validos
+
+
+def _tem_descricao_alvo(df: pd.DataFrame) -> bool:
+    return bool((df["DESCRICAO"] == DESCRICAO_FILTRO).any())
+
+
+def _converter_registros(df: pd.DataFrame, ano: int, trimestre: str) -> pd.DataFrame:
+    """Converte as colunas de origem em um lote, sem filtrar o arquivo."""
+    texto = (
+        _como_texto(df["VL_SALDO_FINAL"])
+        .str.replace(".", "", regex=False)  # Remove separador de milhares
+        .str.replace(",", ".", regex=False)  # Converte vírgula decimal para ponto
+    )
+    valores, validos = _converter_valores(texto)
 
-    return None
+    # Valores malformados são descartados
+    # CNPJ e RazaoSocial não estão disponíveis na fonte (API ANS)
+    return criar_lote(
+        _categoria_texto(df["REG_ANS"])[validos],
+        ano,
+        trimestre,
+        valores[validos]
+    )
 
 
-def normalizar(df: pd.DataFrame, ano: int, trimestre: str):
+def normalizar_em_chunks(chunks, ano: int, trimestre: str) -> pd.DataFrame:
     """
+    Normaliza os blocos de um mesmo arquivo.
+
     Se o arquivo contém 'Despesas com Eventos / Sinistros',
     inclui TODOS os registros do arquivo no resultado.
     Caso contrário, retorna vazio (arquivo descartado).
@@ -40,97 +291,372 @@ def normalizar(df: pd.DataFrame, ano: int, trimestre: str):
     VALORES ZERADOS/NEGATIVOS:
     - Mantém todos (indcluindo zerados e negativos)
     - Consolidador marcará como suspeitos para auditoria
+    
+    Cada bloco é convertido por coluna (sem iterrows) assim que lido; o
+    arquivo só é aceito se algum bloco contiver a descrição alvo. Apenas o
+    resultado normalizado (compacto) fica em memória, nunca o arquivo inteiro.
+    
+    Returns:
+        Lote colunar (src.lotes), vazio se o arquivo for descartado.
     """
-    registros = []
-
-    # Colunas obrigatórias segundo análise real dos arquivos
-    # Resiliente: se arquivo não tiver essas colunas, é descartado
-    colunas_necessarias = [
-        "DESCRICAO",
-        "REG_ANS",
-        "VL_SALDO_FINAL"
-    ]
+    partes = []
+    tem_descricao_alvo = False
 
-    for coluna in colunas_necessarias:
-        if coluna not in df.columns:
-            # Arquivo não serve para o processamento
-            return registros
+    for chunk in chunks:
+        # Resiliente: se arquivo não tiver essas colunas, é descartado
+        if any(coluna not in chunk.columns for coluna in COLUNAS_NECESSARIAS):
+            return lote_vazio()
 
-    # Verifica se EXISTE ao menos um registro com a descrição alvo
-    # Isso qualifica o arquivo para ser processado integralmente
-    tem_descricao_alvo = (df["DESCRICAO"] == DESCRICAO_FILTRO).any()
+        tem_descricao_alvo = tem_descricao_alvo or _tem_descricao_alvo(chunk)
+        partes.append(_converter_registros(chunk, ano, trimestre))
 
     if not tem_descricao_alvo:
         # Arquivo não contém despesas com eventos/sinistros, descarta
-        return registros
+        return lote_vazio()
 
-    # Se chegou aqui, processa TODO o arquivo
-    # Motivo: Se o arquivo tem "Despesas com Eventos / Sinistros",
-    # significa que é relevante e todos os registros são válidos
-    for _, row in df.iterrows():
-        try:
-            valor = float(
-                str(row["VL_SALDO_FINAL"])
-                .replace(".", "")  # Remove separador de milhares
-                .replace(",", ".")  # Converte vírgula decimal para ponto
-            )
-        except Exception:
-            # Valor malformado, pula este registro
-            continue
+    return concatenar_lotes(partes)
+
+
+def _ler_e_normalizar(caminho: str, ano: int, trimestre: str, arquivo=None):
+    # None indica falha de leitura: não vai para os caches, e o chamador
+    # trata o arquivo como vazio nesta execução
+    if caminho.lower().endswith((".csv", ".txt")):
+        leitor = ler_csv_em_chunks
+    elif caminho.lower().endswith(".xlsx"):
+        leitor = ler_xlsx_em_chunks
+    else:
+        return lote_vazio()
+
+    def contar(chunks):
+        # Linhas lidas da fonte, para as métricas de execução
+        for chunk in chunks:
+            somar("linhas_entrada", len(chunk))
+            yield chunk
+
+    try:
+        return normalizar_em_chunks(contar(leitor(caminho, arquivo)), ano, trimestre)
+    except Exception as e:
+        print(f"Erro ao ler arquivo {caminho}: {e}")
+        return None
 
-        registros.append({
-            "CNPJ": "",               # Não disponível na fonte (API ANS)
-            "RazaoSocial": "",        # Não disponível na fonte (API ANS)
-            "REG_ANS": str(row["REG_ANS"]).strip(),
-            "Ano": ano,
-            "Trimestre": trimestre,
-            "ValorDespesas": valor
-        })
 
-    return registros
+def _caminho_cache_arquivo(assinatura: dict, ano: int, trimestre) -> str:
+    chave = json.dumps(
+        {**assinatura, "ano": ano, "trimestre": str(trimestre), "versao_parser": VERSAO_PARSER},
+        sort_keys=True
+    )
+    nome = hashlib.sha256(chave.encode("utf-8")).hexdigest()
+    return os.path.join(PASTA_CACHE_ARQUIVOS, f"{nome}.parquet")
 
 
-def processar_arquivo(caminho: str, ano: int, trimestre: str):
+def _com_cache(assinatura: dict, ano: int, trimestre, processar):
     """
-    Orquestra leitura + normalização de um único arquivo.
+    Devolve o lote do cache Parquet ou executa `processar()` e grava o resultado.
+
+    Um resultado None (falha de leitura) é devolvido sem ser gravado, para
+    que a próxima execução tente o arquivo de novo.
     """
-    df = ler_arquivo(caminho)
+    if not USAR_CACHE_ARQUIVOS:
+        return processar()
 
-    if df is None or df.empty:
-        return []
+    caminho_cache = _caminho_cache_arquivo(assinatura, ano, trimestre)
+    lote = ler_lote_parquet(caminho_cache)
 
-    return normalizar(df, ano, trimestre)
+    if lote is None:
+        lote = processar()
+        if lote is not None:
+            salvar_lote_parquet(lote, caminho_cache)
 
+    return lote
 
-def processar_pasta(pasta_base: str, ano: int, trimestre: str):
+
+def processar_arquivo(caminho: str, ano: int, trimestre: str, arquivo=None) -> pd.DataFrame:
     """
-    Processa todos os arquivos válidos dentro da pasta específica do trimestre.
-    Estrutura esperada: pasta_base/YYYY_QT/ (ex: data/extracted/2025_1T/)
+    Orquestra leitura + normalização de um único arquivo.
+    
+    Arquivos do disco são servidos do cache Parquet (PASTA_CACHE_ARQUIVOS)
+    enquanto caminho, tamanho, mtime e VERSAO_PARSER não mudarem.
+    
+    Returns:
+        Lote colunar (src.lotes) com os registros do arquivo, vazio se a
+        leitura falhar.
     """
-    dados = []
+    if arquivo is not None:
+        lote = _ler_e_normalizar(caminho, ano, trimestre, arquivo)
+    else:
+        lote = _ler_do_disco(caminho, ano, trimestre)
+
+    return lote_vazio() if lote is None else lote
+
 
-    # Construir caminho específico do trimestre
+def _ler_do_disco(caminho: str, ano: int, trimestre):
+    """Arquivo do disco via cache Parquet; None se a leitura falhar."""
+    stat = os.stat(caminho)
+    assinatura = {"caminho": caminho, "tamanho": stat.st_size, "mtime": stat.st_mtime_ns}
+
+    return _com_cache(
+        assinatura,
+        ano,
+        trimestre,
+        lambda: _ler_e_normalizar(caminho, ano, trimestre)
+    )
+
+
+def _chave_trimestre(ano: int, trimestre) -> str:
     # trimestre pode ser int (1,2,3) ou str ('1','2','3')
     trimestre_str = str(trimestre).lstrip('0') or '0'  # Remove zeros à esquerda
-    pasta_trimestre = os.path.join(pasta_base, f"{ano}_{trimestre_str}T")
+    return f"{ano}_{trimestre_str}T"
+
+
+def _listar_pasta(pasta_base: str, ano: int, trimestre):
+    """
+    Lista os arquivos válidos da pasta do trimestre, em ordem determinística.
+    Estrutura esperada: pasta_base/YYYY_QT/ (ex: data/extracted/2025_1T/)
+    """
+    pasta_trimestre = os.path.join(pasta_base, _chave_trimestre(ano, trimestre))
 
     # Verificar se a pasta existe
     if not os.path.exists(pasta_trimestre):
         print(f"Aviso: Pasta não encontrada: {pasta_trimestre}")
-        return dados
+        return []
 
-    # Processar apenas arquivos nesta pasta específica
+    arquivos = []
     for root, _, files in os.walk(pasta_trimestre):
         for file in files:
-            caminho_arquivo = os.path.join(root, file)
-
-            if file.lower().endswith((".csv", ".txt", ".xlsx")):
-                dados.extend(
-                    processar_arquivo(
-                        caminho_arquivo,
-                        ano,
-                        trimestre
-                    )
-                )
-
-    return dados
\ No newline at end of file
+            if file.lower().endswith(EXTENSOES_VALIDAS):
+                arquivos.append(os.path.join(root, file))
+
+    return sorted(arquivos)
+
+
+def _listar_zip(caminho_zip: str, ano: int, trimestre):
+    """Lista os membros válidos de um ZIP de trimestre, na ordem do arquivo."""
+    if not caminho_zip or not os.path.exists(caminho_zip):
+        print(f"Aviso: ZIP não encontrado para {trimestre}T/{ano}")
+        return []
+
+    try:
+        with zipfile.ZipFile(caminho_zip, "r") as zip_ref:
+            return [
+                info.filename
+                for info in zip_ref.infolist()
+                if not info.is_dir() and info.filename.lower().endswith(EXTENSOES_VALIDAS)
+            ]
+    except zipfile.BadZipFile as e:
+        print(f"Erro ao ler ZIP {caminho_zip}: {e}")
+        return []
+
+
+def _listar_tarefas(pasta_base: str, ano: int, trimestre, modo: str):
+    """
+    Monta as tarefas de um trimestre: tuplas (caminho_zip, caminho, ano, trimestre).
+    `caminho_zip` é None quando o arquivo está extraído no disco.
+    """
+    if modo == "zip":
+        caminho_zip = localizar_zip(ano, trimestre, pasta_base)
+        return [
+            (caminho_zip, membro, ano, trimestre)
+            for membro in _listar_zip(caminho_zip, ano, trimestre)
+        ]
+
+    return [
+        (None, caminho, ano, trimestre)
+        for caminho in _listar_pasta(pasta_base, ano, trimestre)
+    ]
+
+
+def _processar_tarefa(tarefa):
+    """
+    Processa um arquivo (do disco ou membro de ZIP).
+    
+    Executada nos processos do pool: devolve um lote colunar, que é
+    muito mais barato de serializar que uma lista de dicts, ou None se a
+    leitura falhar.
+    
+    Membros de ZIP usam o cache Parquet chaveado pelo CRC32 do membro, então
+    um trimestre republicado só reprocessa os arquivos que mudaram.
+    """
+    caminho_zip, caminho, ano, trimestre = tarefa
+
+    if caminho_zip is None:
+        return _ler_do_disco(caminho, ano, trimestre)
+
+    try:
+        with zipfile.ZipFile(caminho_zip, "r") as zip_ref:
+            info = zip_ref.getinfo(caminho)
+            assinatura = {
+                "zip": caminho_zip,
+                "membro": caminho,
+                "tamanho": info.file_size,
+                "crc32": info.CRC
+            }
+
+            def ler_membro():
+                with zip_ref.open(info) as membro:
+                    return _ler_e_normalizar(caminho, ano, trimestre, arquivo=membro)
+
+            return _com_cache(assinatura, ano, trimestre, ler_membro)
+    except (zipfile.BadZipFile, KeyError, OSError) as e:
+        print(f"Erro ao ler {caminho} de {caminho_zip}: {e}")
+        return None
+
+
+def _processar_tarefa_medida(tarefa):
+    """
+    `_processar_tarefa` com métricas do arquivo (tempo, CPU, memória e linhas).
+
+    A métrica volta junto com o lote para ser registrada no processo
+    principal (cada processo do pool tem seu próprio coletor).
+    A ausência de linhas_entrada indica lote servido do cache; situacao
+    "erro" indica falha de leitura (lote None).
+    """
+    caminho_zip, caminho, ano, trimestre = tarefa
+
+    with medir("arquivo", caminho, guardar=False, zip=caminho_zip, ano=ano, trimestre=str(trimestre)) as metrica:
+        lote = _processar_tarefa(tarefa)
+        if lote is None:
+            metrica["situacao"] = "erro"
+        metrica["linhas_saida"] = 0 if lote is None else len(lote)
+
+    return lote, metrica
+
+
+def _executar_tarefas(tarefas, workers: int = 1, executor=None):
+    """
+    Executa as tarefas em série ou num pool de processos.
+    
+    `executor.map` devolve os resultados na ordem das tarefas, então a
+    saída é determinística independentemente do número de workers.
+    Um `executor` já aberto (compartilhado entre trimestres processados ao
+    mesmo tempo) é usado no lugar de um pool próprio.
+    
+    Returns:
+        Um lote por tarefa, None para os arquivos cuja leitura falhou.
+    """
+    if executor is not None and tarefas:
+        resultados = list(executor.map(_processar_tarefa_medida, tarefas))
+    elif workers <= 1 or len(tarefas) <= 1:
+        resultados = [_processar_tarefa_medida(tarefa) for tarefa in tarefas]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tarefas))) as executor:
+            resultados = list(executor.map(_processar_tarefa_medida, tarefas))
+
+    for _, metrica in resultados:
+        registrar(metrica)
+
+    return [lote for lote, _ in resultados]
+
+
+def processar_pasta(pasta_base: str, ano: int, trimestre: str, workers: int = 1) -> pd.DataFrame:
+    """
+    Processa todos os arquivos válidos dentro da pasta específica do trimestre.
+    Estrutura esperada: pasta_base/YYYY_QT/ (ex: data/extracted/2025_1T/)
+    
+    Com `workers` > 1, os arquivos são processados em paralelo.
+    """
+    tarefas = _listar_tarefas(pasta_base, ano, trimestre, "disco")
+    lotes = _executar_tarefas(tarefas, workers)
+    return concatenar_lotes(lote for lote in lotes if lote is not None)
+
+
+def processar_trimestres(
+    trimestres,
+    pasta_base: str,
+    manifesto: dict = None,
+    modo: str = "disco",
+    workers: int = 1,
+    executor=None
+):
+    """
+    Processa vários trimestres, reaproveitando o resultado da execução anterior.
+    
+    O resultado normalizado de cada trimestre fica em
+    PASTA_TRIMESTRES/YYYY_QT.parquet e só é refeito quando o ZIP de origem
+    (SHA-256 no manifesto) ou VERSAO_PARSER mudam.
+    
+    Os arquivos de todos os trimestres pendentes vão para um único pool
+    de `workers` processos; o resultado é remontado na ordem de entrada.
+    
+    Args:
+        trimestres: Lista de tuplas (ano, trimestre).
+        pasta_base: data/extracted (modo "disco") ou data/raw (modo "zip").
+        manifesto: Manifesto do pipeline (opcional, sem ele não há cache).
+        modo: Um de MODOS_LEITURA.
+        workers: Número de processos para o parsing (1 = serial).
+        executor: Pool de processos compartilhado (opcional, ignora `workers`).
+        
+    Returns:
+        Lista de tuplas (ano, trimestre, lote) na ordem de `trimestres`.
+    """
+    if modo not in MODOS_LEITURA:
+        raise ValueError(f"Modo de leitura inválido: {modo}")
+
+    resultados = {}
+    pendentes = {}
+    tarefas = []
+
+    for ano, trimestre in trimestres:
+        chave = _chave_trimestre(ano, trimestre)
+        caminho_cache = os.path.join(PASTA_TRIMESTRES, f"{chave}.parquet")
+        entradas = None
+
+        if manifesto is not None:
+            entradas = {
+                "origem_sha256": impressao_trimestre(manifesto, chave, extraido=modo == "disco"),
+                "versao_parser": VERSAO_PARSER
+            }
+
+            if entradas["origem_sha256"] and artefato_atualizado(manifesto, caminho_cache, entradas):
+                lote = ler_lote_parquet(caminho_cache)
+                if lote is not None:
+                    resultados[(ano, trimestre)] = lote
+                    continue
+
+        inicio = len(tarefas)
+        tarefas.extend(_listar_tarefas(pasta_base, ano, trimestre, modo))
+        pendentes[(ano, trimestre)] = (inicio, len(tarefas), entradas, caminho_cache)
+
+    frames = _executar_tarefas(tarefas, workers, executor)
+
+    for (ano, trimestre), (inicio, fim, entradas, caminho_cache) in pendentes.items():
+        lotes = frames[inicio:fim]
+        falhas = sum(lote is None for lote in lotes)
+        lote = concatenar_lotes(lote for lote in lotes if lote is not None)
+
+        if falhas:
+            # Resultado incompleto: sem cache (nem o antigo, que a etapa do
+            # pipeline reaproveitaria), para a próxima execução reler o trimestre
+            print(f"      Aviso: {falhas} arquivo(s) de {trimestre}T/{ano} com erro de leitura; trimestre não vai para o cache")
+            if os.path.exists(caminho_cache):
+                os.remove(caminho_cache)
+        elif entradas and entradas["origem_sha256"] and salvar_lote_parquet(lote, caminho_cache):
+            registrar_artefato(manifesto, caminho_cache, entradas)
+
+        resultados[(ano, trimestre)] = lote
+
+    return [
+        (ano, trimestre, resultados[(ano, trimestre)])
+        for ano, trimestre in trimestres
+    ]
+
+
+def processar_trimestre(
+    pasta_base: str,
+    ano: int,
+    trimestre,
+    manifesto: dict = None,
+    modo: str = "disco",
+    workers: int = 1,
+    executor=None
+):
+    """
+    Processa um único trimestre (ver processar_trimestres).
+    """
+    return processar_trimestres(
+        [(ano, trimestre)],
+        pasta_base,
+        manifesto=manifesto,
+        modo=modo,
+        workers=workers,
+        executor=executor
+    )[0][2]
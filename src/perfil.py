@@ -0,0 +1,95 @@
+import cProfile
+import os
+import sys
+import threading
+from collections import Counter
+from contextlib import contextmanager
+
+# Perfis das etapas selecionadas: <etapa>.pstats (cProfile, abrir com
+# pstats/snakeviz) e <etapa>.collapsed (pilhas amostradas, formato do
+# flamegraph.pl/speedscope)
+PASTA_PERFIL = "data/output/perfil"
+INTERVALO_AMOSTRAGEM = 0.005  # segundos
+
+
+def etapa_selecionada(nome: str, selecao) -> bool:
+    """
+    Indica se a etapa `nome` deve ser perfilada.
+
+    `selecao` aceita nomes exatos, prefixos (ex: "parse" seleciona
+    parse_2025_1T, parse_2025_2T...) ou "todas".
+    """
+    return any(
+        item == "todas" or nome == item or nome.startswith(f"{item}_")
+        for item in selecao
+    )
+
+
+def _rotulo(frame) -> str:
+    codigo = frame.f_code
+    return f"{codigo.co_name} ({os.path.basename(codigo.co_filename)}:{codigo.co_firstlineno})"
+
+
+@contextmanager
+def perfilar(nome: str, pasta: str = PASTA_PERFIL, intervalo: float = INTERVALO_AMOSTRAGEM):
+    """
+    Perfila o bloco com cProfile e com um amostrador de pilhas da thread atual.
+
+    O amostrador lê a pilha da thread a cada `intervalo` segundos e conta
+    as pilhas repetidas (uma linha "raiz;...;folha contagem" por pilha).
+    O cProfile vê só a thread atual até o Python 3.11; no 3.12+ vê o
+    processo inteiro e só um pode estar ativo por vez (por isso o pipeline
+    roda as etapas perfiladas sozinhas). Se outro já estiver ativo, fica só
+    a amostragem. Trabalho feito em outros processos (pool do parser com
+    ETL_WORKERS > 1) não aparece; para ver o parser por dentro, use ETL_WORKERS=1.
+
+    Args:
+        nome: Nome da etapa (nome dos arquivos gerados).
+        pasta: Pasta de saída.
+        intervalo: Intervalo entre amostras.
+    """
+    alvo = threading.get_ident()
+    pilhas = Counter()
+    parar = threading.Event()
+
+    def amostrar():
+        while not parar.wait(intervalo):
+            frame = sys._current_frames().get(alvo)
+            pilha = []
+            while frame is not None:
+                pilha.append(_rotulo(frame))
+                frame = frame.f_back
+            if pilha:
+                pilhas[";".join(reversed(pilha))] += 1
+
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError as e:
+        # Python 3.12+: só um profiler determinístico ativo por vez
+        print(f"      Aviso: cProfile indisponível para {nome}, só amostragem: {e}")
+        profiler = None
+
+    amostrador = threading.Thread(target=amostrar, name=f"perfil-{nome}", daemon=True)
+    amostrador.start()
+
+    try:
+        yield
+    finally:
+        if profiler is not None:
+            profiler.disable()
+        parar.set()
+        amostrador.join()
+
+        os.makedirs(pasta, exist_ok=True)
+        base = os.path.join(pasta, nome)
+
+        if profiler is not None:
+            profiler.dump_stats(f"{base}.pstats")
+
+        with open(f"{base}.collapsed", "w", encoding="utf-8") as f:
+            for pilha, contagem in sorted(pilhas.items()):
+                f.write(f"{pilha} {contagem}\n")
+
+        arquivos = f"{base}.pstats / {base}.collapsed" if profiler is not None else f"{base}.collapsed"
+        print(f"      Perfil de {nome}: {arquivos} ({sum(pilhas.values())} amostras)")
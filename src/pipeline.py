@@ -0,0 +1,347 @@
+import hashlib
+import json
+import os
+import sys
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager, nullcontext, redirect_stdout
+
+from src.instrumentacao import contar_linhas, medir, registrar
+from src.manifest import descrever_arquivo, salvar_manifesto
+from src.perfil import etapa_selecionada, perfilar
+
+# Etapas executadas ao mesmo tempo (as pesadas usam seus próprios processos)
+MAX_ETAPAS_PARALELAS = 4
+
+
+class PipelineInterrompido(Exception):
+    """Uma etapa não tem o que entregar (ex: nenhum registro); o pipeline para sem erro fatal."""
+
+
+def etapa(
+    nome: str,
+    executar,
+    depende=(),
+    entradas=None,
+    saidas=(),
+    carregar=None,
+    descricao: str = None
+) -> dict:
+    """
+    Declara uma etapa do pipeline.
+
+    Args:
+        nome: Identificador único (chave em manifesto["etapas"]).
+        executar: Função que recebe {dependência: valor} e devolve o valor
+            da etapa (passado às etapas que dependem dela).
+        depende: Nomes das etapas das quais esta depende.
+        entradas: Função sem argumentos com a impressão digital das entradas
+            próprias da etapa (versões, parâmetros, hashes do manifesto),
+            avaliada depois que as dependências terminam. None indica uma
+            etapa que sempre roda (ex: downloads, cuja entrada é a fonte remota).
+        saidas: Arquivos gravados pela etapa. O checkpoint só vale se todos
+            existirem com o mesmo conteúdo registrado.
+        carregar: Função sem argumentos que reconstrói o valor a partir das
+            saídas quando a etapa é pulada. Sem ela, o valor é recalculado
+            (só se alguma etapa seguinte precisar dele).
+        descricao: Texto mostrado no log.
+    """
+    return {
+        "nome": nome,
+        "executar": executar,
+        "depende": tuple(depende),
+        "entradas": entradas,
+        "saidas": list(saidas),
+        "carregar": carregar,
+        "descricao": descricao or nome,
+    }
+
+
+class _SaidaPorEtapa:
+    """
+    stdout compartilhado pelas etapas que rodam ao mesmo tempo.
+
+    Cada thread acumula o que escreve até o fim da linha; as linhas
+    completas saem inteiras, sob uma trava, prefixadas com o nome da
+    etapa que as escreveu. Linhas de threads criadas pela própria etapa
+    (ex: downloads paralelos) também saem inteiras, mas sem prefixo.
+    Processos filhos (pools criados por fork durante as etapas) escrevem
+    direto no destino, sem a trava.
+    """
+
+    def __init__(self, destino):
+        self._destino = destino
+        self._trava = threading.Lock()
+        self._local = threading.local()
+        self._pid = os.getpid()
+
+    @contextmanager
+    def etapa(self, nome: str):
+        """Atribui à etapa `nome` as linhas escritas pela thread atual no bloco."""
+        anterior = getattr(self._local, "etapa", None)
+        self._local.etapa = nome
+        try:
+            yield
+        finally:
+            if getattr(self._local, "pendente", ""):
+                self.write("\n")
+            self._local.etapa = anterior
+
+    def write(self, texto: str) -> int:
+        if os.getpid() != self._pid:
+            return self._destino.write(texto)
+
+        *linhas, self._local.pendente = (getattr(self._local, "pendente", "") + texto).split("\n")
+        if linhas:
+            nome = getattr(self._local, "etapa", None)
+            with self._trava:
+                for linha in linhas:
+                    self._destino.write(f"[{nome}] {linha}\n" if nome and linha else f"{linha}\n")
+        return len(texto)
+
+    def flush(self) -> None:
+        self._destino.flush()
+
+    def __getattr__(self, atributo):
+        return getattr(self._destino, atributo)
+
+
+def _impressao(dados) -> str:
+    texto = json.dumps(dados, sort_keys=True, default=str)
+    return hashlib.sha256(texto.encode("utf-8")).hexdigest()
+
+
+def _ordenar(etapas: list) -> list:
+    """Ordem topológica estável (na ordem de declaração quando possível)."""
+    por_nome = {e["nome"]: e for e in etapas}
+    if len(por_nome) != len(etapas):
+        raise ValueError("Nomes de etapas duplicados")
+
+    for e in etapas:
+        for dependencia in e["depende"]:
+            if dependencia not in por_nome:
+                raise ValueError(f"Etapa {e['nome']} depende de etapa inexistente: {dependencia}")
+
+    ordem, feitas = [], set()
+    while len(ordem) < len(etapas):
+        prontas = [
+            e for e in etapas
+            if e["nome"] not in feitas and all(d in feitas for d in e["depende"])
+        ]
+        if not prontas:
+            raise ValueError("Dependências circulares entre etapas")
+        ordem.extend(prontas)
+        feitas.update(e["nome"] for e in prontas)
+
+    return ordem
+
+
+def _descrever_saidas(saidas: list, anteriores: dict) -> dict:
+    """SHA-256 de cada saída (None se ausente), reaproveitando hashes com mesmo tamanho/mtime."""
+    descricoes = {}
+    for caminho in saidas:
+        try:
+            descricoes[caminho] = descrever_arquivo(caminho, anteriores.get(caminho))
+        except OSError:
+            descricoes[caminho] = None
+    return descricoes
+
+
+def _executar(e: dict, entradas: dict, situacao: str = "executada", perfis=()):
+    """
+    Executa uma etapa medindo tempo, CPU, memória e linhas (src.instrumentacao)
+    e, se ela estiver em `perfis`, perfilando (src.perfil).
+    """
+    linhas = [contar_linhas(v) for v in entradas.values()]
+    perfil = perfilar(e["nome"]) if perfis and etapa_selecionada(e["nome"], perfis) else nullcontext()
+
+    with medir("etapa", e["nome"], situacao=situacao) as metrica, perfil:
+        if any(n is not None for n in linhas):
+            metrica["linhas_entrada"] = sum(n for n in linhas if n is not None)
+        resultado = e["executar"](entradas)
+        metrica["linhas_saida"] = contar_linhas(resultado)
+
+    return resultado
+
+
+def executar_etapas(
+    etapas: list,
+    manifesto: dict,
+    max_paralelas: int = MAX_ETAPAS_PARALELAS,
+    salvar: bool = True,
+    perfis=()
+) -> dict:
+    """
+    Executa um grafo de etapas com checkpoints por impressão digital.
+
+    A chave de cada etapa combina suas `entradas` com as impressões das
+    dependências; a impressão da etapa acrescenta o SHA-256 das `saidas`.
+    Uma etapa é pulada quando a chave e as saídas batem com o registro em
+    manifesto["etapas"]; assim uma nova execução retoma da primeira etapa
+    com entradas alteradas (ou que falhou). Se uma etapa roda de novo mas
+    produz as mesmas saídas, as seguintes continuam sendo puladas.
+
+    Etapas independentes rodam em paralelo em até `max_paralelas` threads;
+    nesse caso cada linha que uma etapa imprime sai inteira, prefixada com
+    o nome dela (ver _SaidaPorEtapa). Etapas perfiladas rodam sozinhas: no
+    Python 3.12+ o cProfile vale para o processo inteiro e só um pode
+    estar ativo, então o perfil de uma etapa não pode conviver com outras.
+    O valor de uma etapa pulada só é carregado (ou recalculado) se uma
+    etapa seguinte precisar rodar.
+
+    O manifesto é salvo a cada etapa concluída enquanto nenhuma outra
+    estiver rodando (as etapas também escrevem nele) e ao final, inclusive
+    em caso de erro, depois que as etapas em andamento terminam.
+
+    Args:
+        etapas: Etapas declaradas com `etapa`.
+        manifesto: Manifesto do pipeline (os checkpoints ficam em "etapas").
+        max_paralelas: Threads para etapas simultâneas.
+        salvar: Grava o manifesto nos checkpoints.
+        perfis: Etapas a perfilar quando executadas (ver src.perfil.etapa_selecionada).
+
+    Returns:
+        Dicionário {nome: valor} das etapas finais executadas (valores
+        intermediários são descartados assim que deixam de ser usados).
+    """
+    ordem = _ordenar(etapas)
+    por_nome = {e["nome"]: e for e in ordem}
+    registros = manifesto.setdefault("etapas", {})
+
+    valores = {}
+    impressoes = {}
+    travas = {nome: threading.Lock() for nome in por_nome}
+    dependentes = {nome: [] for nome in por_nome}
+    for e in ordem:
+        for dependencia in e["depende"]:
+            dependentes[dependencia].append(e["nome"])
+
+    def liberar(e):
+        # Descarta valores que nenhuma etapa pendente ainda vai usar. Os de
+        # etapas que sempre rodam ficam: não podem ser recalculados à parte
+        for dependencia in e["depende"]:
+            if por_nome[dependencia]["entradas"] is None:
+                continue
+            if all(d in impressoes for d in dependentes[dependencia]):
+                with travas[dependencia]:
+                    valores.pop(dependencia, None)
+
+    def valor(nome):
+        # Valor de uma etapa já resolvida; se foi pulada, carrega ou recalcula
+        with travas[nome]:
+            if nome not in valores:
+                e = por_nome[nome]
+                if e["carregar"] is not None:
+                    with medir("etapa", nome, situacao="carregada") as metrica:
+                        valores[nome] = e["carregar"]()
+                        metrica["linhas_saida"] = contar_linhas(valores[nome])
+                else:
+                    print(f"      ↻ {e['descricao']}: recalculando para as etapas seguintes")
+                    valores[nome] = _executar(e, {d: valor(d) for d in e["depende"]}, "recalculada", perfis)
+            return valores[nome]
+
+    saida = _SaidaPorEtapa(sys.stdout) if max_paralelas > 1 else None
+
+    def rodar(e, chave):
+        with saida.etapa(e["nome"]) if saida else nullcontext():
+            resultado = _executar(e, {d: valor(d) for d in e["depende"]}, perfis=perfis)
+        with travas[e["nome"]]:
+            valores[e["nome"]] = resultado
+        return chave
+
+    def concluir(e, chave):
+        anteriores = registros.get(e["nome"], {}).get("saidas") or {}
+        saidas = _descrever_saidas(e["saidas"], anteriores)
+        impressoes[e["nome"]] = _impressao({
+            "chave": chave,
+            "saidas": {c: d and d["sha256"] for c, d in saidas.items()}
+        })
+        registros[e["nome"]] = {
+            "chave": chave,
+            "saidas": saidas,
+            "impressao": impressoes[e["nome"]],
+        }
+
+    def checkpoint_valido(e, chave) -> bool:
+        registro = registros.get(e["nome"])
+        if e["entradas"] is None or not registro or registro.get("chave") != chave:
+            return False
+
+        anteriores = registro.get("saidas") or {}
+        if set(anteriores) != set(e["saidas"]):
+            return False
+
+        atuais = _descrever_saidas(e["saidas"], anteriores)
+        return all(
+            atuais[c] is not None and anteriores[c] is not None
+            and atuais[c]["sha256"] == anteriores[c]["sha256"]
+            for c in e["saidas"]
+        )
+
+    def perfilada(e) -> bool:
+        return bool(perfis) and etapa_selecionada(e["nome"], perfis)
+
+    pendentes = list(ordem)
+    em_andamento = {}
+    erro = None
+
+    with redirect_stdout(saida) if saida else nullcontext(), \
+            ThreadPoolExecutor(max_workers=max(1, max_paralelas)) as executor:
+        while pendentes or em_andamento:
+            # Inicia (ou pula) todas as etapas com dependências resolvidas
+            for e in list(pendentes):
+                if erro is not None or any(perfilada(x) for x in em_andamento.values()):
+                    break
+                if not all(d in impressoes for d in e["depende"]):
+                    continue
+
+                pendentes.remove(e)
+                chave = _impressao({
+                    "entradas": e["entradas"]() if e["entradas"] is not None else None,
+                    "dependencias": {d: impressoes[d] for d in e["depende"]},
+                })
+
+                if checkpoint_valido(e, chave):
+                    print(f"\n[{e['nome']}] {e['descricao']}: entradas inalteradas, pulando")
+                    registrar({"tipo": "etapa", "nome": e["nome"], "situacao": "pulada"})
+                    impressoes[e["nome"]] = registros[e["nome"]]["impressao"]
+                    liberar(e)
+                    continue
+
+                if perfilada(e) and em_andamento:
+                    # Espera as etapas em andamento terminarem para rodar sozinha
+                    pendentes.insert(0, e)
+                    break
+
+                print(f"\n[{e['nome']}] {e['descricao']}...")
+                em_andamento[executor.submit(rodar, e, chave)] = e
+
+            if not em_andamento:
+                if pendentes and erro is None:
+                    # Etapas puladas liberaram outras: nova varredura
+                    continue
+                break
+
+            concluidas, _ = wait(em_andamento, return_when=FIRST_COMPLETED)
+            for futuro in concluidas:
+                e = em_andamento.pop(futuro)
+                try:
+                    concluir(e, futuro.result())
+                except BaseException as exc:
+                    # Sem checkpoint: a próxima execução retoma desta etapa
+                    registros.pop(e["nome"], None)
+                    if erro is None:
+                        erro = exc
+                else:
+                    liberar(e)
+
+            if salvar and not em_andamento:
+                salvar_manifesto(manifesto)
+
+    if salvar:
+        salvar_manifesto(manifesto)
+
+    if erro is not None:
+        raise erro
+
+    return valores
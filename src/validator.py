@@ -1,6 +1,12 @@
+import json
+import os
+import numpy as np
 import pandas as pd
 import re
 
+PESO_DIGITO1 = np.array([5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2])
+PESO_DIGITO2 = np.array([6, 5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2])
+
 
 def validar_cnpj(cnpj: str) -> bool:
     if not isinstance(cnpj, str):
@@ -28,48 +34,167 @@ def validar_cnpj(cnpj: str) -> bool:
     return cnpj[-2:] == digito1 + digito2
 
 
-def validar_dados(df: pd.DataFrame) -> pd.DataFrame:
+def _digito_verificador(digitos: np.ndarray, peso: np.ndarray) -> np.ndarray:
+    resto = (digitos @ peso) % 11
+    return np.where(resto < 2, 0, 11 - resto)
+
+
+def validar_cnpjs(cnpjs) -> np.ndarray:
+    """
+    Versão vetorizada de `validar_cnpj` para uma coluna inteira.
+
+    Cada CNPJ distinto é validado uma única vez: os dígitos viram uma
+    matriz (n, 14) e os dois dígitos verificadores saem de produtos
+    matriciais com os pesos. O resultado é idêntico ao de `validar_cnpj`
+    aplicado linha a linha (inclusive a rejeição de dígitos todos iguais).
+
+    Args:
+        cnpjs: Sequência de CNPJs (texto, formatado ou não; nulos são inválidos).
+
+    Returns:
+        Array booleano alinhado com `cnpjs`.
+    """
+    codigos, unicos = pd.factorize(pd.Series(cnpjs, dtype=object))
+    unicos = np.asarray(unicos, dtype=object)
+    validos = np.zeros(len(unicos), dtype=bool)
+
+    textos = np.array([isinstance(valor, str) for valor in unicos], dtype=bool)
+    limpos = pd.Series(unicos[textos], dtype=object).str.replace(r"\D", "", regex=True)
+    posicoes = np.flatnonzero(textos)
+
+    com_14 = (limpos.str.len() == 14).to_numpy()
+    ascii_ = np.array([texto.isascii() for texto in limpos], dtype=bool)
+
+    # Dígitos ASCII: conversão direta dos bytes para a matriz (n, 14)
+    candidatos = limpos[com_14 & ascii_]
+    if len(candidatos):
+        digitos = (
+            np.frombuffer("".join(candidatos).encode("ascii"), dtype=np.uint8)
+            .reshape(-1, 14)
+            .astype(np.int64)
+            - ord("0")
+        )
+        repetidos = (digitos == digitos[:, :1]).all(axis=1)
+        validos[posicoes[com_14 & ascii_]] = (
+            ~repetidos
+            & (digitos[:, 12] == _digito_verificador(digitos[:, :12], PESO_DIGITO1))
+            & (digitos[:, 13] == _digito_verificador(digitos[:, :13], PESO_DIGITO2))
+        )
+
+    # Outros dígitos Unicode (raríssimos) seguem pela versão escalar
+    for i in posicoes[com_14 & ~ascii_]:
+        validos[i] = validar_cnpj(unicos[i])
+
+    return np.where(codigos >= 0, validos[codigos], False)
+
+
+def _normalizar_colunas(df: pd.DataFrame) -> dict:
+    """Colunas convertidas antes das regras (e mantidas assim na saída)."""
+    colunas = {}
+
+    # Converter valor para numérico (já é float quando vem do consolidado em memória)
+    if not pd.api.types.is_numeric_dtype(df["ValorDespesas"]):
+        colunas["ValorDespesas"] = pd.to_numeric(df["ValorDespesas"], errors="coerce")
+
+    colunas["RazaoSocial"] = df["RazaoSocial"].astype(str).str.strip()
+    return colunas
+
+
+# Regras de validação: (nome, descrição, máscara dos registros válidos).
+# Cada regra recebe o DataFrame já normalizado e devolve um array booleano;
+# a ordem define a qual regra é atribuído um registro que falha em várias.
+REGRAS_VALIDACAO = [
+    (
+        "valor",
+        "Removidos por valor <= 0",
+        lambda df: (df["ValorDespesas"] > 0).to_numpy()
+    ),
+    (
+        "razao_social",
+        "Removidos por razão social vazia",
+        lambda df: (df["RazaoSocial"] != "").to_numpy()
+    ),
+    (
+        "cnpj",
+        "Removidos por CNPJ inválido",
+        lambda df: validar_cnpjs(df["CNPJ"])
+    ),
+]
+
+
+def aplicar_regras(df: pd.DataFrame, regras=REGRAS_VALIDACAO, guardar_indices: bool = False):
+    """
+    Avalia todas as regras como máscaras e filtra o DataFrame uma única vez.
+
+    As regras olham as colunas originais (só as normalizadas são novas),
+    sem cópias intermediárias do DataFrame nem colunas auxiliares.
+
+    Args:
+        df: DataFrame com dados enriquecidos.
+        regras: Lista de (nome, descrição, regra) como REGRAS_VALIDACAO.
+        guardar_indices: Inclui no relatório os índices rejeitados por regra.
+
+    Returns:
+        Tupla (df_valido, relatorio). O relatório tem, por regra, os
+        registros rejeitados por ela (primeira regra que falhou) e o total
+        de falhas na regra.
+    """
+    # Sem cópia dos dados: as demais colunas são compartilhadas com `df`
+    dados = df.assign(**_normalizar_colunas(df))
+
+    validos = np.ones(len(dados), dtype=bool)
+    relatorio = {}
+
+    for nome, descricao, regra in regras:
+        mascara = np.asarray(regra(dados), dtype=bool)
+        rejeitados = validos & ~mascara
+
+        relatorio[nome] = {
+            "descricao": descricao,
+            "rejeitados": int(rejeitados.sum()),
+            "falhas": int((~mascara).sum()),
+        }
+        if guardar_indices:
+            relatorio[nome]["indices"] = dados.index[rejeitados].tolist()
+
+        validos &= mascara
+
+    return dados[validos], relatorio
+
+
+def validar_dados(df: pd.DataFrame, caminho_relatorio: str = None, guardar_indices: bool = False) -> pd.DataFrame:
     """
     Valida e limpa os dados enriquecidos.
     
-    Validações aplicadas:
+    Validações aplicadas (REGRAS_VALIDACAO):
     - ValorDespesas > 0 (valores zerados/negativos removidos)
     - RazaoSocial não vazia
     - CNPJ válido (formato e dígitos verificadores)
     
     Args:
         df: DataFrame com dados enriquecidos.
+        caminho_relatorio: Se informado, grava o relatório de rejeições em JSON.
+        guardar_indices: Inclui no relatório os índices rejeitados por regra.
         
     Returns:
         DataFrame apenas com registros válidos.
     """
-    df = df.copy()
-    total_inicial = len(df)
-
-    # Converter valor para numérico
-    df["ValorDespesas"] = pd.to_numeric(df["ValorDespesas"], errors="coerce")
-    
-    # Filtrar valores positivos
-    df = df[df["ValorDespesas"] > 0]
-    removidos_valor = total_inicial - len(df)
-
-    # Razão social válida
-    df["RazaoSocial"] = df["RazaoSocial"].astype(str).str.strip()
-    antes_razao = len(df)
-    df = df[df["RazaoSocial"] != ""]
-    removidos_razao = antes_razao - len(df)
-
-    # Validação de CNPJ
-    df["cnpj_valido"] = df["CNPJ"].apply(validar_cnpj)
-    cnpjs_invalidos = (~df["cnpj_valido"]).sum()
-    df = df[df["cnpj_valido"]]
-    
-    # Remover coluna auxiliar
-    df = df.drop(columns=["cnpj_valido"], errors="ignore")
+    df_valido, relatorio = aplicar_regras(df, guardar_indices=guardar_indices)
 
     # Log de validação
-    print(f"      Removidos por valor <= 0: {removidos_valor}")
-    print(f"      Removidos por razão social vazia: {removidos_razao}")
-    print(f"      Removidos por CNPJ inválido: {cnpjs_invalidos}")
-
-    return df
+    for regra in relatorio.values():
+        print(f"      {regra['descricao']}: {regra['rejeitados']}")
+
+    if caminho_relatorio:
+        os.makedirs(os.path.dirname(caminho_relatorio) or ".", exist_ok=True)
+        temporario = caminho_relatorio + ".tmp"
+        with open(temporario, "w", encoding="utf-8") as f:
+            json.dump(
+                {"registros": len(df), "validos": len(df_valido), "regras": relatorio},
+                f,
+                indent=2,
+                ensure_ascii=False
+            )
+        os.replace(temporario, caminho_relatorio)
+
+    return df_valido